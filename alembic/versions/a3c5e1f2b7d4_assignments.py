@@ -0,0 +1,44 @@
+"""assignments
+
+Revision ID: a3c5e1f2b7d4
+Revises: 71d0fd55128f
+Create Date: 2026-10-17 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e1f2b7d4'
+down_revision: Union[str, None] = '71d0fd55128f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('assignments',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('plannable_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('course', sa.String(), nullable=True),
+    sa.Column('deadline', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('submitted', sa.Boolean(), nullable=True),
+    sa.Column('graded', sa.Boolean(), nullable=True),
+    sa.Column('points_possible', sa.Float(), nullable=True),
+    sa.Column('synced_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'plannable_id', name='uq_assignments_user_id_plannable_id')
+    )
+    op.create_index('ix_assignments_user_id_deadline', 'assignments', ['user_id', 'deadline'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_assignments_user_id_deadline', table_name='assignments')
+    op.drop_table('assignments')
@@ -0,0 +1,34 @@
+"""reminder send failures
+
+Revision ID: b3f8d2a6c905
+Revises: a9c4e6b2d178
+Create Date: 2026-10-17 18:05:14.226301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f8d2a6c905'
+down_revision: Union[str, None] = 'a9c4e6b2d178'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE reminder_status ADD VALUE IF NOT EXISTS 'failed'")
+    op.add_column('reminders', sa.Column('send_attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reminders', 'send_attempts')
+    # Postgres cannot drop an enum value; failed rows are folded back into
+    # finished and the value is left in place.
+    op.execute("UPDATE reminders SET status = 'finished' WHERE status = 'failed'")
+    op.execute("UPDATE reminders_archive SET status = 'finished' WHERE status = 'failed'")
@@ -0,0 +1,38 @@
+"""sync checkpoints
+
+Revision ID: b7e2a9d4c610
+Revises: f2d6c0b8e391
+Create Date: 2026-10-17 15:02:19.371846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a9d4c610'
+down_revision: Union[str, None] = 'f2d6c0b8e391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sync_checkpoints',
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('shards', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_user_id', sa.UUID(), nullable=True),
+    sa.Column('synced', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('shard', 'shards')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sync_checkpoints')
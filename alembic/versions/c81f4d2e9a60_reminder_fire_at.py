@@ -0,0 +1,41 @@
+"""reminder fire_at and dispatched_at
+
+Revision ID: c81f4d2e9a60
+Revises: a3c5e1f2b7d4
+Create Date: 2026-10-17 11:03:18.771902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4d2e9a60'
+down_revision: Union[str, None] = 'a3c5e1f2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reminders', sa.Column('fire_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('reminders', sa.Column('dispatched_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing reminders were all published with an ETA already, so they are
+    # backfilled as dispatched and never claimed by the dispatcher.
+    op.execute(
+        "UPDATE reminders SET fire_at = deadline - interval '1 hour', "
+        "dispatched_at = now()"
+    )
+    op.alter_column('reminders', 'fire_at', nullable=False)
+    op.create_index('ix_reminders_due', 'reminders', ['fire_at'], unique=False,
+                    postgresql_where=sa.text("status = 'pending' AND dispatched_at IS NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reminders_due', table_name='reminders',
+                  postgresql_where=sa.text("status = 'pending' AND dispatched_at IS NULL"))
+    op.drop_column('reminders', 'dispatched_at')
+    op.drop_column('reminders', 'fire_at')
@@ -0,0 +1,30 @@
+"""reminder dispatch lease
+
+Revision ID: d0a7e3c5b914
+Revises: b3f8d2a6c905
+Create Date: 2026-10-17 19:12:40.518327
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0a7e3c5b914'
+down_revision: Union[str, None] = 'b3f8d2a6c905'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reminders_dispatched', 'reminders', ['dispatched_at'], unique=False,
+                    postgresql_where=sa.text("status = 'pending' AND dispatched_at IS NOT NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reminders_dispatched', table_name='reminders',
+                  postgresql_where=sa.text("status = 'pending' AND dispatched_at IS NOT NULL"))
@@ -0,0 +1,47 @@
+"""reminder idempotency
+
+Revision ID: d5a8f1c7e243
+Revises: b7e2a9d4c610
+Create Date: 2026-10-17 15:48:37.560912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8f1c7e243'
+down_revision: Union[str, None] = 'b7e2a9d4c610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reminders', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    # Keep the earliest-firing pending reminder per assignment and cancel
+    # the duplicates, so the unique index below can be built.
+    op.execute("""
+        UPDATE reminders SET status = 'cancelled'
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY user_id, plannable_id ORDER BY fire_at, id
+                ) AS n
+                FROM reminders
+                WHERE status = 'pending'
+            ) ranked
+            WHERE n > 1
+        )
+    """)
+    op.create_index('uq_reminders_active_user_id_plannable_id', 'reminders', ['user_id', 'plannable_id'], unique=True, postgresql_where=sa.text("status = 'pending'"))
+    op.create_index('uq_reminders_user_id_idempotency_key', 'reminders', ['user_id', 'idempotency_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_reminders_user_id_idempotency_key', table_name='reminders')
+    op.drop_index('uq_reminders_active_user_id_plannable_id', table_name='reminders', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_column('reminders', 'idempotency_key')
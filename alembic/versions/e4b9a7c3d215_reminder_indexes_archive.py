@@ -0,0 +1,50 @@
+"""reminder indexes and archive
+
+Revision ID: e4b9a7c3d215
+Revises: c81f4d2e9a60
+Create Date: 2026-10-17 12:26:05.318447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9a7c3d215'
+down_revision: Union[str, None] = 'c81f4d2e9a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reminders_user_id_status_plannable_id', 'reminders', ['user_id', 'status', 'plannable_id'], unique=False)
+    op.create_index('ix_reminders_task_id', 'reminders', ['task_id'], unique=True)
+    op.create_index('ix_reminders_deadline', 'reminders', ['deadline'], unique=False)
+    op.create_table('reminders_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('plannable_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.UUID(), nullable=False),
+    sa.Column('course_name', sa.String(length=320), nullable=False),
+    sa.Column('assignment_name', sa.String(length=320), nullable=False),
+    sa.Column('deadline', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('fire_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('dispatched_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('status', postgresql.ENUM('finished', 'pending', name='reminder_status', create_type=False), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reminders_archive_user_id', 'reminders_archive', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reminders_archive_user_id', table_name='reminders_archive')
+    op.drop_table('reminders_archive')
+    op.drop_index('ix_reminders_deadline', table_name='reminders')
+    op.drop_index('ix_reminders_task_id', table_name='reminders')
+    op.drop_index('ix_reminders_user_id_status_plannable_id', table_name='reminders')
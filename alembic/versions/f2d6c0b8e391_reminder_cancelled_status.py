@@ -0,0 +1,32 @@
+"""reminder cancelled status
+
+Revision ID: f2d6c0b8e391
+Revises: e4b9a7c3d215
+Create Date: 2026-10-17 13:40:52.906114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d6c0b8e391'
+down_revision: Union[str, None] = 'e4b9a7c3d215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE reminder_status ADD VALUE IF NOT EXISTS 'cancelled'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Postgres cannot drop an enum value; cancelled rows are folded back
+    # into finished and the value is left in place.
+    op.execute("UPDATE reminders SET status = 'finished' WHERE status = 'cancelled'")
+    op.execute("UPDATE reminders_archive SET status = 'finished' WHERE status = 'cancelled'")
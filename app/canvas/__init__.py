@@ -0,0 +1,7 @@
+from app.canvas.client import canvas_manager, get_canvas_client
+from app.canvas.cache import PlannerCache, planner_cache, \
+    get_planner_cache, planner_cache_key, build_planner_cache
+from app.canvas.planner import CanvasError
+from app.canvas.sync import sync_user_assignments, \
+    sync_user_assignments_once
+from app.canvas.shards import sync_shard
@@ -0,0 +1,198 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Protocol
+
+import orjson
+
+from app.core import settings
+
+
+class CacheTier(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class LocalTier:
+    """In-process LRU keyed by string, bounded by entry count and total bytes.
+
+    Every entry carries its own expiry; expired entries are dropped lazily on
+    lookup and eagerly when space is needed.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        if len(value) > self._max_bytes:
+            return
+        self._pop(key)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._size += len(value)
+        self._evict()
+
+    async def delete(self, key: str) -> None:
+        self._pop(key)
+
+    def _pop(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _evict(self):
+        while self._data and (len(self._data) > self._max_entries
+                              or self._size > self._max_bytes):
+            key, (_, value) = self._data.popitem(last=False)
+            self._size -= len(value)
+
+
+class MemoryStore:
+    """Minimal stand-in for the subset of the ``redis.asyncio`` client used by
+    :class:`SharedTier`; lets the shared tier run without a Redis server."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ex: int) -> None:
+        self._data[key] = (time.monotonic() + ex, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def aclose(self) -> None:
+        self._data.clear()
+
+
+class SharedTier:
+    """Cache tier backed by a Redis-compatible store shared by all workers."""
+
+    def __init__(self, store):
+        self._store = store
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._store.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self._store.set(key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._store.delete(key)
+
+    async def close(self) -> None:
+        await self._store.aclose()
+
+
+class PlannerCache:
+    """Two-tier cache for planner pages.
+
+    Entries are served as-is while younger than ``fresh_ttl``. Older entries
+    are kept for ``stale_ttl`` so their ETags can be used to revalidate
+    against Canvas instead of downloading the pages again.
+    """
+
+    def __init__(self, local: CacheTier, shared: Optional[SharedTier] = None,
+                 fresh_ttl: int = 60, stale_ttl: int = 3600):
+        self._local = local
+        self._shared = shared
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self._local.get(key)
+        if value is None and self._shared is not None:
+            value = await self._shared.get(key)
+            if value is not None:
+                await self._local.set(key, value, self.stale_ttl)
+        if value is None:
+            return None
+        return orjson.loads(value)
+
+    async def set(self, key: str, entry: dict) -> None:
+        value = orjson.dumps(entry)
+        await self._local.set(key, value, self.stale_ttl)
+        if self._shared is not None:
+            await self._shared.set(key, value, self.stale_ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._local.delete(key)
+        if self._shared is not None:
+            await self._shared.delete(key)
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["stored_at"] < self.fresh_ttl
+
+    async def close(self) -> None:
+        if self._shared is not None:
+            await self._shared.close()
+
+
+def planner_cache_key(user_id, token: str, start: datetime,
+                      end: datetime) -> str:
+    # The token is part of the key so saving a new token never serves pages
+    # fetched with the old one.
+    token_hash = hashlib.sha256(token.encode()).hexdigest()[:16]
+    return (f"planner:{user_id}:{token_hash}:"
+            f"{start.isoformat()}:{end.isoformat()}")
+
+
+def build_shared_tier() -> Optional[SharedTier]:
+    if not settings.CANVAS_CACHE_REDIS_URL:
+        return None
+    if settings.CANVAS_CACHE_REDIS_URL == "memory://":
+        return SharedTier(MemoryStore())
+
+    import redis.asyncio
+
+    return SharedTier(redis.asyncio.from_url(settings.CANVAS_CACHE_REDIS_URL))
+
+
+local_tier = LocalTier(settings.CANVAS_CACHE_MAX_ENTRIES,
+                       settings.CANVAS_CACHE_MAX_BYTES)
+
+
+def build_planner_cache() -> PlannerCache:
+    """A cache over the process-wide local tier and a new shared tier.
+
+    The shared tier's client belongs to the event loop it is first used on,
+    so processes that run each sync on a fresh loop (the Celery worker) build
+    one per run and close it afterwards.
+    """
+    return PlannerCache(
+        local_tier,
+        build_shared_tier(),
+        fresh_ttl=settings.CANVAS_CACHE_TTL,
+        stale_ttl=settings.CANVAS_CACHE_STALE_TTL,
+    )
+
+
+planner_cache = build_planner_cache()
+
+
+async def get_planner_cache() -> PlannerCache:
+    return planner_cache
@@ -0,0 +1,73 @@
+from typing import Optional
+
+import httpx
+
+from app.canvas.governor import GovernedTransport, build_governor
+from app.core import settings
+from app.core.metrics import on_canvas_request, on_canvas_response
+
+
+class CanvasClientManager:
+    """Owns the process-wide pooled HTTP client used for Canvas API calls.
+
+    The client is created in the FastAPI lifespan and reused by every request,
+    so connections (and their TLS sessions) to Canvas stay warm between calls.
+    """
+
+    def __init__(self, base_url: str, client_kwargs: dict = {}):
+        self._base_url = base_url
+        self._client_kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def init(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self._base_url,
+                                             **self._client_kwargs)
+        return self._client
+
+    async def close(self):
+        if self._client is None:
+            raise Exception("CanvasClientManager is not initialized")
+
+        await self._client.aclose()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise Exception("CanvasClientManager is not initialized")
+        return self._client
+
+
+def build_client_kwargs() -> dict:
+    # The pool limits and HTTP/2 belong to the inner transport; the governor
+    # wraps it so every request made through the client is rate-limit aware.
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.CANVAS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.CANVAS_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.CANVAS_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.CANVAS_HTTP2,
+    )
+    return {
+        "transport": GovernedTransport(transport, build_governor()),
+        "timeout": httpx.Timeout(
+            connect=settings.CANVAS_CONNECT_TIMEOUT,
+            read=settings.CANVAS_READ_TIMEOUT,
+            write=settings.CANVAS_WRITE_TIMEOUT,
+            pool=settings.CANVAS_POOL_TIMEOUT,
+        ),
+        "event_hooks": {
+            "request": [on_canvas_request],
+            "response": [on_canvas_response],
+        },
+    }
+
+
+canvas_manager = CanvasClientManager(settings.CANVAS_BASE_URL,
+                                     build_client_kwargs())
+
+
+async def get_canvas_client() -> httpx.AsyncClient:
+    return canvas_manager.client
@@ -0,0 +1,97 @@
+"""Decoding of Canvas planner pages into assignment records.
+
+Planner items carry large ``plannable`` and ``submissions`` objects of which
+we use a handful of fields. With ``msgspec`` installed (``speedups`` extra)
+the page is decoded straight from the response bytes into the typed structs
+below; fields that are not declared, including whole subtrees, are skipped
+by the parser without being materialized. Without it the page is parsed with
+orjson and the fields are picked out of the resulting dicts.
+"""
+from typing import Optional, Union
+
+import orjson
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if msgspec is not None:
+    class Plannable(msgspec.Struct):
+        title: Optional[str] = None
+        due_at: Optional[str] = None
+        points_possible: Optional[float] = None
+
+    class Submissions(msgspec.Struct):
+        submitted: Optional[bool] = None
+        graded: Optional[bool] = None
+
+    class PlannerItem(msgspec.Struct):
+        plannable_type: Optional[str] = None
+        plannable_id: Optional[int] = None
+        context_name: Optional[str] = None
+        plannable: Optional[Plannable] = None
+        # Canvas sends ``false`` for items that take no submissions.
+        submissions: Union[Submissions, bool, None] = None
+
+    planner_page_decoder = msgspec.json.Decoder(list[PlannerItem])
+
+# Raised for a page that is not JSON or not shaped like a planner page.
+# orjson.JSONDecodeError is a ValueError; msgspec.ValidationError is a
+# msgspec.DecodeError.
+DECODE_ERRORS = (ValueError, TypeError, AttributeError) + \
+    ((msgspec.DecodeError,) if msgspec is not None else ())
+
+
+def to_assignment(item: dict) -> dict:
+    plannable = item.get("plannable") or {}
+    submission = item.get("submissions") or {}
+    return {
+        "plannable_id": item.get("plannable_id"),
+        "name": plannable.get("title"),
+        "deadline": plannable.get("due_at"),
+        "course": item.get("context_name"),
+        "submitted": submission.get("submitted"),
+        "graded": submission.get("graded"),
+        "points_possible": plannable.get("points_possible")
+    }
+
+
+def to_assignments(page: list[dict]) -> list[dict]:
+    return [to_assignment(item) for item in page
+            if item.get("plannable_type") == "assignment"]
+
+
+def decode_assignments_orjson(content: bytes) -> list[dict]:
+    return to_assignments(orjson.loads(content))
+
+
+def decode_assignments_typed(content: bytes) -> list[dict]:
+    assignments = []
+    for item in planner_page_decoder.decode(content):
+        if item.plannable_type != "assignment":
+            continue
+        plannable = item.plannable
+        submission = item.submissions
+        if not isinstance(submission, Submissions):
+            submission = None
+        assignments.append({
+            "plannable_id": item.plannable_id,
+            "name": plannable.title if plannable else None,
+            "deadline": plannable.due_at if plannable else None,
+            "course": item.context_name,
+            "submitted": submission.submitted if submission else None,
+            "graded": submission.graded if submission else None,
+            "points_possible":
+                plannable.points_possible if plannable else None,
+        })
+    return assignments
+
+
+def decode_assignments(content: bytes) -> list[dict]:
+    """Decode one planner page (raw response bytes) into assignment
+    records, dropping every non-assignment item."""
+    if msgspec is not None:
+        return decode_assignments_typed(content)
+    return decode_assignments_orjson(content)
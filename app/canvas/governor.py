@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import random
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+
+from app.core import settings
+
+
+class QuotaState:
+    """What we know about one token's quota on one Canvas host."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.remaining: Optional[float] = None
+        self.cost = 0.0
+        self.paused_until = 0.0
+        self.changed = asyncio.Condition()
+
+
+class CanvasGovernor:
+    """Adaptive, per-token concurrency control for Canvas requests.
+
+    Canvas meters each token with a leaky bucket and reports what is left in
+    ``X-Rate-Limit-Remaining`` (and what the last call cost in
+    ``X-Request-Cost``). The governor allows ``limit`` requests per token and
+    host at a time, grows it while the quota is comfortable, halves it as the
+    quota runs low, and drops to one request (plus a pause) when
+    Canvas throttles with 403/429. Throttled requests are retried with
+    jittered backoff for up to ``max_wait`` seconds before the throttled
+    response is handed back to the caller.
+    """
+
+    def __init__(self,
+                 initial_concurrency: int = 4,
+                 max_concurrency: int = 16,
+                 low_watermark: float = 150.0,
+                 high_watermark: float = 400.0,
+                 max_retries: int = 4,
+                 backoff: float = 1.0,
+                 max_wait: float = 30.0,
+                 max_keys: int = 10000):
+        self._initial_concurrency = initial_concurrency
+        self._max_concurrency = max_concurrency
+        self._low_watermark = low_watermark
+        self._high_watermark = high_watermark
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_wait = max_wait
+        self._max_keys = max_keys
+        self._states: OrderedDict[tuple[str, str], QuotaState] = OrderedDict()
+
+    def _state(self, request: httpx.Request) -> QuotaState:
+        token = request.headers.get("Authorization", "")
+        key = (hashlib.sha256(token.encode()).hexdigest()[:16],
+               request.url.host)
+        state = self._states.get(key)
+        if state is None:
+            self._evict()
+            state = self._states[key] = QuotaState(self._initial_concurrency)
+        self._states.move_to_end(key)
+        return state
+
+    def _evict(self):
+        # Forget the least recently used tokens that have nothing in flight.
+        for key, state in list(self._states.items()):
+            if len(self._states) < self._max_keys:
+                return
+            if state.in_flight == 0:
+                del self._states[key]
+
+    async def _acquire(self, state: QuotaState):
+        async with state.changed:
+            while True:
+                pause = state.paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(state.changed.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if state.in_flight < state.limit:
+                    state.in_flight += 1
+                    return
+                await state.changed.wait()
+
+    async def _release(self, state: QuotaState):
+        async with state.changed:
+            state.in_flight -= 1
+            state.changed.notify_all()
+
+    def _observe(self, state: QuotaState, response: httpx.Response):
+        try:
+            state.remaining = float(response.headers["X-Rate-Limit-Remaining"])
+            state.cost = float(response.headers.get("X-Request-Cost", 0))
+        except (KeyError, ValueError):
+            return
+        # What would be left if every slot spent another request of the
+        # same cost right now.
+        projected = state.remaining - state.cost * state.limit
+        if projected < self._low_watermark:
+            state.limit = max(1, state.limit // 2)
+        elif projected > self._high_watermark:
+            state.limit = min(self._max_concurrency, state.limit + 1)
+
+    async def _throttle(self, state: QuotaState, attempt: int) -> float:
+        delay = self._backoff * 2 ** attempt
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        async with state.changed:
+            state.limit = 1
+            state.paused_until = max(state.paused_until,
+                                     time.monotonic() + delay)
+        return delay
+
+    async def send(self, request: httpx.Request, send) -> httpx.Response:
+        state = self._state(request)
+        started = time.monotonic()
+
+        for attempt in range(self._max_retries + 1):
+            await self._acquire(state)
+            try:
+                response = await send(request)
+                if await is_throttled(response):
+                    self._observe(state, response)
+                    delay = await self._throttle(state, attempt)
+                    out_of_time = time.monotonic() - started + delay > \
+                        self._max_wait
+                    if attempt == self._max_retries or out_of_time:
+                        return response
+                    await response.aclose()
+                    continue
+                self._observe(state, response)
+                return response
+            finally:
+                await self._release(state)
+
+
+async def is_throttled(response: httpx.Response) -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code == 403:
+        # Canvas reports an exhausted quota as "403 Forbidden (Rate Limit
+        # Exceeded)"; other 403s are genuine permission errors.
+        await response.aread()
+        return b"Rate Limit Exceeded" in response.content
+    return False
+
+
+class GovernedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport,
+                 governor: CanvasGovernor):
+        self._transport = transport
+        self._governor = governor
+
+    async def handle_async_request(self,
+                                   request: httpx.Request) -> httpx.Response:
+        return await self._governor.send(
+            request, self._transport.handle_async_request
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def build_governor() -> CanvasGovernor:
+    return CanvasGovernor(
+        initial_concurrency=settings.CANVAS_GOVERNOR_INITIAL_CONCURRENCY,
+        max_concurrency=settings.CANVAS_GOVERNOR_MAX_CONCURRENCY,
+        low_watermark=settings.CANVAS_GOVERNOR_LOW_WATERMARK,
+        high_watermark=settings.CANVAS_GOVERNOR_HIGH_WATERMARK,
+        max_retries=settings.CANVAS_GOVERNOR_MAX_RETRIES,
+        backoff=settings.CANVAS_GOVERNOR_BACKOFF,
+        max_wait=settings.CANVAS_GOVERNOR_MAX_WAIT,
+    )
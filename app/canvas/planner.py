@@ -0,0 +1,103 @@
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.canvas.cache import PlannerCache
+from app.canvas.decoding import DECODE_ERRORS, decode_assignments
+
+PLANNER_ITEMS_PATH = "/api/v1/planner/items"
+PLANNER_PAGE_SIZE = 50
+
+
+class CanvasError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def raise_for_canvas_status(response: httpx.Response):
+    if response.status_code == 401:
+        raise CanvasError(401, "Invalid token")
+    elif response.status_code != 200:
+        try:
+            detail = response.json()["message"]
+        except (ValueError, KeyError, TypeError):
+            detail = response.reason_phrase
+        raise CanvasError(response.status_code, detail)
+
+
+def planner_params(start: datetime, end: datetime,
+                   per_page: int = PLANNER_PAGE_SIZE) -> dict:
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "per_page": per_page,
+    }
+
+
+async def iter_assignment_pages(
+        client: httpx.AsyncClient,
+        token: str,
+        start: datetime,
+        end: datetime,
+        cache: Optional[PlannerCache] = None,
+        cache_key: Optional[str] = None,
+        force: bool = False,
+) -> AsyncIterator[list[dict]]:
+    """Yield assignment records page by page.
+
+    With a cache, a fresh entry is replayed without touching Canvas. A stale
+    entry, or any entry with ``force``, is revalidated page by page with
+    ``If-None-Match``; pages answered with 304 reuse the stored records and
+    next link.
+    """
+    caching = cache is not None and cache_key is not None
+
+    entry = await cache.get(cache_key) if caching else None
+    if entry is not None and not force and cache.is_fresh(entry):
+        for page in entry["pages"]:
+            yield page["items"]
+        return
+
+    prior = {page["url"]: page for page in entry["pages"]} if entry else {}
+    pages = []
+    headers = {"Authorization": f"Bearer {token}"}
+    url: Optional[str] = PLANNER_ITEMS_PATH
+    params: Optional[dict] = planner_params(start, end)
+
+    while url is not None:
+        stored = prior.get(url)
+        request_headers = headers
+        if stored is not None and stored["etag"]:
+            request_headers = {**headers, "If-None-Match": stored["etag"]}
+
+        response = await client.get(url, params=params,
+                                    headers=request_headers)
+        if response.status_code == 304 and stored is not None:
+            page = stored
+        else:
+            raise_for_canvas_status(response)
+            try:
+                items = decode_assignments(response.content)
+            except DECODE_ERRORS:
+                raise CanvasError(502, "Invalid planner response")
+            page = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "next": response.links.get("next", {}).get("url"),
+                "items": items,
+            }
+
+        if caching:
+            pages.append(page)
+        yield page["items"]
+
+        url = page["next"]
+        params = None
+
+    if caching:
+        await cache.set(cache_key,
+                        {"stored_at": time.time(), "pages": pages})
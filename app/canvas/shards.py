@@ -0,0 +1,174 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from sqlalchemy import select, update, and_, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.canvas.cache import PlannerCache, build_planner_cache
+from app.canvas.client import build_client_kwargs
+from app.canvas.sync import sync_user_assignments
+from app.core import settings
+from app.core.database import DatabaseSessionManager, engine_kwargs
+from app.models import CanvasToken, SyncCheckpoint
+
+
+def shard_expr(shards: int):
+    """A user's shard. ``uuid_hash_extended`` is the hash Postgres uses for
+    hash partitioning, so it is stable across restarts and upgrades."""
+    return func.mod(func.abs(func.uuid_hash_extended(CanvasToken.user_id, 0)),
+                    shards)
+
+
+def shard_users_stmt(shard: int, shards: int, after: Optional[uuid.UUID],
+                     limit: int):
+    stmt = select(CanvasToken.user_id, CanvasToken.token) \
+        .where(shard_expr(shards) == shard)
+    if after is not None:
+        stmt = stmt.where(CanvasToken.user_id > after)
+    return stmt.order_by(CanvasToken.user_id).limit(limit)
+
+
+def checkpoint_where(shard: int, shards: int):
+    return and_(SyncCheckpoint.shard == shard, SyncCheckpoint.shards == shards)
+
+
+async def claim_shard(session, shard: int, shards: int,
+                      now: datetime) -> tuple[bool, Optional[uuid.UUID]]:
+    """Take the shard's checkpoint for this run.
+
+    Returns ``(claimed, after)``: a finished checkpoint starts a new run from
+    the first user, an unfinished one whose heartbeat outlived the lease is
+    resumed after ``last_user_id``, and one that is still alive is left to
+    the run that holds it.
+    """
+    await session.execute(
+        insert(SyncCheckpoint)
+        .values(shard=shard, shards=shards, started_at=now, heartbeat_at=now,
+                finished_at=now, synced=0, failed=0)
+        .on_conflict_do_nothing()
+    )
+    checkpoint = await session.scalar(
+        select(SyncCheckpoint)
+        .where(checkpoint_where(shard, shards))
+        .with_for_update()
+    )
+
+    lease = timedelta(seconds=settings.CANVAS_SYNC_SHARD_LEASE)
+    if checkpoint.finished_at is None and \
+            now - checkpoint.heartbeat_at < lease:
+        await session.rollback()
+        return False, None
+
+    if checkpoint.finished_at is None:
+        after = checkpoint.last_user_id
+    else:
+        after = None
+        checkpoint.started_at = now
+        checkpoint.finished_at = None
+        checkpoint.last_user_id = None
+        checkpoint.synced = 0
+        checkpoint.failed = 0
+    checkpoint.heartbeat_at = now
+    await session.commit()
+    return True, after
+
+
+async def sync_one(manager: DatabaseSessionManager,
+                   client: httpx.AsyncClient,
+                   cache: PlannerCache,
+                   semaphore: asyncio.Semaphore,
+                   user_id: uuid.UUID,
+                   token: str) -> bool:
+    async with semaphore:
+        # Any error, Canvas or database, fails this user only; the session
+        # rolls back on the way out.
+        try:
+            async with manager.session() as session:
+                await sync_user_assignments(session.execute, client, user_id,
+                                            token, cache)
+                await session.commit()
+        except Exception as e:
+            print(f"Canvas sync for {user_id} failed: {e!r}")
+            return False
+        return True
+
+
+async def sync_shard(shard: int, shards: int) -> Optional[dict]:
+    """Sync every user of one shard on this event loop.
+
+    Users are taken in ``user_id`` order, ``CANVAS_SYNC_BATCH_SIZE`` at a time,
+    and up to ``CANVAS_SYNC_CONCURRENCY`` of them are in flight at once over a
+    single pooled Canvas client (and its rate-limit governor). Pages are
+    revalidated against the planner cache's shared tier, so unchanged ones
+    come back as 304s. The checkpoint advances after each batch. Returns ``None`` if another run holds the
+    shard.
+    """
+    concurrency = settings.CANVAS_SYNC_CONCURRENCY
+    # asyncpg connections belong to the loop that opened them, so the shard
+    # gets its own engine, sized to its concurrency, for the life of the run.
+    manager = DatabaseSessionManager(
+        settings.database_url.unicode_string(),
+        {**engine_kwargs(is_async=True),
+         "pool_size": concurrency, "max_overflow": 1},
+        name="sync",
+    )
+    cache = build_planner_cache()
+    try:
+        async with manager.session() as session:
+            claimed, after = await claim_shard(session, shard, shards,
+                                               datetime.now(timezone.utc))
+        if not claimed:
+            return None
+
+        semaphore = asyncio.Semaphore(concurrency)
+        stats = {"synced": 0, "failed": 0}
+        async with httpx.AsyncClient(base_url=settings.CANVAS_BASE_URL,
+                                     **build_client_kwargs()) as client:
+            while True:
+                async with manager.session() as session:
+                    users = (await session.execute(shard_users_stmt(
+                        shard, shards, after, settings.CANVAS_SYNC_BATCH_SIZE
+                    ))).all()
+                if not users:
+                    break
+
+                # sync_one already turns errors into False; anything that
+                # still escapes is counted as a failure rather than
+                # abandoning the rest of the batch.
+                results = await asyncio.gather(*(
+                    sync_one(manager, client, cache, semaphore,
+                             user.user_id, user.token)
+                    for user in users
+                ), return_exceptions=True)
+                synced = sum(result is True for result in results)
+                failed = len(results) - synced
+                stats["synced"] += synced
+                stats["failed"] += failed
+                after = users[-1].user_id
+
+                async with manager.session() as session:
+                    await session.execute(
+                        update(SyncCheckpoint)
+                        .where(checkpoint_where(shard, shards))
+                        .values(last_user_id=after,
+                                heartbeat_at=datetime.now(timezone.utc),
+                                synced=SyncCheckpoint.synced + synced,
+                                failed=SyncCheckpoint.failed + failed)
+                    )
+                    await session.commit()
+
+        async with manager.session() as session:
+            now = datetime.now(timezone.utc)
+            await session.execute(
+                update(SyncCheckpoint)
+                .where(checkpoint_where(shard, shards))
+                .values(heartbeat_at=now, finished_at=now)
+            )
+            await session.commit()
+        return stats
+    finally:
+        await cache.close()
+        await manager.close()
@@ -0,0 +1,118 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from sqlalchemy import delete, and_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.canvas.cache import PlannerCache, build_planner_cache, \
+    planner_cache_key
+from app.canvas.client import build_client_kwargs
+from app.canvas.planner import iter_assignment_pages
+from app.core import settings
+from app.models import Assignment
+from app.versions import bump_versions_stmt
+
+SYNC_WINDOW = timedelta(days=15)
+
+Execute = Callable[[object], Awaitable[object]]
+
+
+def sync_window(now: Optional[datetime] = None) -> tuple[datetime, datetime]:
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(minute=0, second=0, microsecond=0)
+    return start, start + SYNC_WINDOW
+
+
+def parse_deadline(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def upsert_assignments_stmt(user_id: uuid.UUID, records: list[dict],
+                            synced_at: datetime):
+    stmt = insert(Assignment).values([
+        {
+            "user_id": user_id,
+            "plannable_id": record["plannable_id"],
+            "name": record["name"],
+            "course": record["course"],
+            "deadline": parse_deadline(record["deadline"]),
+            "submitted": record["submitted"],
+            "graded": record["graded"],
+            "points_possible": record["points_possible"],
+            "synced_at": synced_at,
+        }
+        for record in records
+    ])
+    return stmt.on_conflict_do_update(
+        constraint="uq_assignments_user_id_plannable_id",
+        set_={
+            "name": stmt.excluded.name,
+            "course": stmt.excluded.course,
+            "deadline": stmt.excluded.deadline,
+            "submitted": stmt.excluded.submitted,
+            "graded": stmt.excluded.graded,
+            "points_possible": stmt.excluded.points_possible,
+            "synced_at": stmt.excluded.synced_at,
+        }
+    )
+
+
+def prune_assignments_stmt(user_id: uuid.UUID, synced_at: datetime):
+    return delete(Assignment).where(
+        and_(
+            Assignment.user_id == user_id,
+            Assignment.synced_at < synced_at
+        )
+    )
+
+
+async def sync_user_assignments(
+        execute: Execute,
+        client: httpx.AsyncClient,
+        user_id: uuid.UUID,
+        token: str,
+        cache: Optional[PlannerCache] = None,
+        force: bool = False,
+) -> int:
+    """Write a user's upcoming Canvas assignments into ``assignments``.
+
+    Pages are upserted as they arrive; rows not seen in this run are pruned
+    only after the last page succeeded, so a failed sync keeps old data. The
+    user's version is bumped with the write, invalidating listing ETags.
+    ``execute`` runs a statement on the caller's session and is awaited, which
+    lets the API (async session) and the worker (sync session) share this.
+    ``force`` asks Canvas even when the cached pages are fresh (still with
+    their ETags). The caller commits.
+    """
+    synced_at = datetime.now(timezone.utc)
+    start, end = sync_window(synced_at)
+    cache_key = planner_cache_key(user_id, token, start, end)
+
+    count = 0
+    async for page in iter_assignment_pages(client, token, start, end,
+                                            cache, cache_key, force):
+        if page:
+            await execute(upsert_assignments_stmt(user_id, page, synced_at))
+            count += len(page)
+
+    await execute(prune_assignments_stmt(user_id, synced_at))
+    await execute(bump_versions_stmt([user_id]))
+    return count
+
+
+async def sync_user_assignments_once(execute: Execute, user_id: uuid.UUID,
+                                     token: str) -> int:
+    """Run a single sync with a short-lived client and cache, for processes
+    that have no long-lived event loop (e.g. the Celery worker)."""
+    cache = build_planner_cache()
+    try:
+        async with httpx.AsyncClient(base_url=settings.CANVAS_BASE_URL,
+                                     **build_client_kwargs()) as client:
+            return await sync_user_assignments(execute, client, user_id,
+                                               token, cache)
+    finally:
+        await cache.close()
@@ -1,7 +1,11 @@
 import os
+from datetime import datetime
+from typing import Optional
 
 from celery import Celery
+from kombu import Exchange, Queue
 from app.core import settings
+from app.core.metrics import instrument_celery
 
 
 celery = Celery(__name__,
@@ -9,4 +13,71 @@ celery = Celery(__name__,
                 backend=settings.CELERY_BACKEND_URL)
 
 
-celery.autodiscover_tasks(['app.tasks'])
\ No newline at end of file
+# Login-critical emails get a queue (and worker) of their own so a burst of
+# due reminders can never delay them; see docker-compose.yaml for the layout.
+# Both email queues also honour per-message priority, which needs a prefetch
+# of one to take effect.
+celery.conf.task_default_queue = "celery"
+celery.conf.task_queues = (
+    Queue("celery", Exchange("celery"), routing_key="celery"),
+    Queue("transactional", Exchange("transactional"),
+          routing_key="transactional",
+          queue_arguments={"x-max-priority": 10}),
+    Queue("reminders", Exchange("reminders"), routing_key="reminders",
+          queue_arguments={"x-max-priority": 10}),
+    Queue("sync", Exchange("sync"), routing_key="sync"),
+)
+celery.conf.task_routes = {
+    "app.tasks.send_verification_email": {"queue": "transactional",
+                                          "priority": 9},
+    "app.tasks.send_password_reset_email": {"queue": "transactional",
+                                            "priority": 9},
+    "app.tasks.send_notification": {"queue": "reminders", "priority": 5},
+    "app.tasks.sync_all_assignments": {"queue": "sync"},
+    "app.tasks.sync_assignment_shard": {"queue": "sync"},
+    "app.tasks.sync_assignments": {"queue": "sync"},
+}
+celery.conf.worker_prefetch_multiplier = 1
+
+
+celery.conf.beat_schedule = {
+    "sync-canvas-assignments": {
+        "task": "app.tasks.sync_all_assignments",
+        "schedule": settings.CANVAS_SYNC_INTERVAL,
+    },
+    "archive-reminders": {
+        "task": "app.tasks.archive_reminders",
+        "schedule": settings.REMINDER_ARCHIVE_INTERVAL,
+    },
+}
+
+
+instrument_celery()
+
+
+celery.autodiscover_tasks(['app.tasks'])
+
+
+def publish_notifications(
+        messages: list[tuple[str, str, dict, Optional[datetime]]]
+) -> dict[str, Exception]:
+    """Publish ``(task_id, email, task, eta)`` messages over one broker
+    connection; an ``eta`` of ``None`` runs the task right away. Returns the
+    errors of the messages that failed, by task id.
+
+    Tasks are sent by name so publishers don't have to import ``app.tasks``.
+    """
+    errors = {}
+    with celery.producer_or_acquire() as producer:
+        for task_id, email, task, eta in messages:
+            try:
+                celery.send_task(
+                    "app.tasks.send_notification",
+                    args=[email, task],
+                    eta=eta,
+                    task_id=task_id,
+                    producer=producer
+                )
+            except Exception as e:
+                errors[task_id] = e
+    return errors
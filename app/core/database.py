@@ -1,9 +1,13 @@
 import contextlib
+import threading
+import time
 from typing import Any, AsyncIterator
 
 from sqlalchemy import create_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core import settings
+from app.core.metrics import DB_POOL_WAIT, instrument_engine
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
     AsyncSession,
@@ -14,9 +18,127 @@ from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
 Base = declarative_base()
 
+
+class PoolWaitMixin:
+    """Records how long callers wait to check a connection out of the pool.
+
+    ``engine_name`` labels the wait metric; the session managers set it on
+    the pool they create.
+    """
+
+    engine_name = ""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            DB_POOL_WAIT.labels(engine=self.engine_name).observe(waited)
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep its label.
+        pool = super().recreate()
+        pool.engine_name = self.engine_name
+        return pool
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "wait_total": self.wait_total,
+            "wait_max": self.wait_max,
+        }
+
+
+class TimedQueuePool(PoolWaitMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(PoolWaitMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+ENGINE_PROFILES: dict[str, dict[str, Any]] = {
+    "dev": {
+        "echo": True,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_pre_ping": False,
+        "pool_recycle": -1,
+        "pool_timeout": 30,
+    },
+    "prod": {
+        "echo": False,
+        "pool_size": 10,
+        "max_overflow": 5,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_timeout": 10,
+    },
+}
+
+
+def engine_kwargs(is_async: bool) -> dict[str, Any]:
+    """Engine options for ``settings.DB_PROFILE``, with any ``DB_*`` setting
+    that is set overriding the profile. The async engine (API) and the sync
+    engine (Celery worker) are sized independently."""
+    kwargs = dict(ENGINE_PROFILES[settings.DB_PROFILE])
+
+    overrides = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+    if is_async:
+        overrides["pool_size"] = settings.DB_POOL_SIZE
+        overrides["max_overflow"] = settings.DB_MAX_OVERFLOW
+    else:
+        overrides["pool_size"] = settings.DB_SYNC_POOL_SIZE
+        overrides["max_overflow"] = settings.DB_SYNC_MAX_OVERFLOW
+    kwargs.update({k: v for k, v in overrides.items() if v is not None})
+
+    if is_async:
+        kwargs["poolclass"] = TimedAsyncQueuePool
+        connect_args: dict[str, Any] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+        if settings.DB_STATEMENT_TIMEOUT:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)
+            }
+    else:
+        kwargs["poolclass"] = TimedQueuePool
+        connect_args = {}
+        if settings.DB_STATEMENT_TIMEOUT:
+            connect_args["options"] = \
+                f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"
+    kwargs["connect_args"] = connect_args
+
+    return kwargs
+
+
 class DatabaseSessionManager:
-    def __init__(self, host: str, engine_kwargs: dict[str, Any] = {}):
+    def __init__(self, host: str, engine_kwargs: dict[str, Any] = {},
+                 name: str = "api"):
         self._engine = create_async_engine(host, **engine_kwargs)
+        self._engine.sync_engine.pool.engine_name = name
+        instrument_engine(self._engine.sync_engine, name)
         self._sessionmaker = async_sessionmaker(autocommit=False,
                                                 bind=self._engine)
 
@@ -28,6 +150,10 @@ class DatabaseSessionManager:
         self._engine = None
         self._sessionmaker = None
 
+    def pool_stats(self) -> dict[str, Any]:
+        if self._engine is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+        return self._engine.sync_engine.pool.stats()
 
     @contextlib.asynccontextmanager
     async def connect(self) -> AsyncIterator[AsyncConnection]:
@@ -57,16 +183,44 @@ class DatabaseSessionManager:
             await session.close()
 
 class SyncDatabaseSessionManager:
+    """Sync (psycopg2) engine for the Celery worker.
+
+    The engine is only created on first use, so processes that import this
+    module without touching the sync database (the API) never load psycopg2
+    or open its pool.
+    """
+
     def __init__(self, db_url: str, engine_kwargs: dict = {}):
-        self._engine = create_engine(db_url, **engine_kwargs)
-        self._sessionmaker = sessionmaker(bind=self._engine, autocommit=False, autoflush=False)
+        self._db_url = db_url
+        self._engine_kwargs = engine_kwargs
+        self._engine = None
+        self._sessionmaker = None
+        self._lock = threading.Lock()
+
+    def _init(self):
+        with self._lock:
+            if self._engine is None:
+                self._engine = create_engine(self._db_url,
+                                             **self._engine_kwargs)
+                self._engine.pool.engine_name = "worker"
+                instrument_engine(self._engine, "worker")
+                self._sessionmaker = sessionmaker(bind=self._engine,
+                                                  autocommit=False,
+                                                  autoflush=False)
 
     def get_session(self) -> Session:
+        if self._sessionmaker is None:
+            self._init()
         return self._sessionmaker()
 
+    def pool_stats(self) -> dict[str, Any]:
+        if self._engine is None:
+            return {}
+        return self._engine.pool.stats()
+
 sync_sessionmanager = SyncDatabaseSessionManager(
     settings.database_url_sync.unicode_string(),
-    {"echo": True}
+    engine_kwargs(is_async=False)
 )
 
 @contextlib.contextmanager
@@ -78,7 +232,8 @@ def get_sync_db():
         db.close()
 
 
-sessionmanager = DatabaseSessionManager(settings.database_url.unicode_string(), {"echo": True})
+sessionmanager = DatabaseSessionManager(settings.database_url.unicode_string(),
+                                        engine_kwargs(is_async=True))
 
 async def get_db():
     async with sessionmanager.session() as session:
@@ -0,0 +1,232 @@
+"""Prometheus instrumentation shared by the API and the Celery worker.
+
+``prometheus-client`` is optional (``metrics`` extra); without it every
+metric below is a no-op and ``/metrics`` answers 503. When several processes
+serve or run work (uvicorn workers, Celery prefork children), point
+``PROMETHEUS_MULTIPROC_DIR`` at a directory shared by all of them so that
+``/metrics`` aggregates their samples.
+
+The directory must belong to one host (container): sample files are named
+by PID, so processes of different containers would overwrite each other's.
+Each service is therefore scraped on its own; a Celery worker (and
+app.dispatcher) serves its samples on ``METRICS_PORT``.
+"""
+import os
+import time
+from typing import Optional
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+
+class NullMetric:
+    def labels(self, *args, **kwargs) -> "NullMetric":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+
+def histogram(name: str, documentation: str, labelnames: tuple[str, ...]):
+    if prometheus_client is None:
+        return NullMetric()
+    return prometheus_client.Histogram(name, documentation, labelnames)
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...]):
+    if prometheus_client is None:
+        return NullMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds",
+    "API request latency by route.",
+    ("method", "route", "status"),
+)
+
+CANVAS_REQUEST_DURATION = histogram(
+    "canvas_request_duration_seconds",
+    "Latency of outbound Canvas API calls.",
+    ("method",),
+)
+CANVAS_REQUESTS = counter(
+    "canvas_requests_total",
+    "Outbound Canvas API calls by response status.",
+    ("method", "status"),
+)
+
+DB_QUERY_DURATION = histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time.",
+    ("engine",),
+)
+DB_POOL_WAIT = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    ("engine",),
+)
+
+TASK_DURATION = histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time.",
+    ("task",),
+)
+TASK_QUEUE_DELAY = histogram(
+    "celery_task_queue_delay_seconds",
+    "Delay between when a task was due (its ETA, or publish time) and when "
+    "it started.",
+    ("task",),
+)
+TASK_FAILURES = counter(
+    "celery_task_failures_total",
+    "Celery tasks that raised.",
+    ("task",),
+)
+
+
+def render() -> Optional[tuple[bytes, str]]:
+    """Return the exposition body and content type, or ``None`` when
+    ``prometheus-client`` is not installed."""
+    if prometheus_client is None:
+        return None
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return (prometheus_client.generate_latest(registry),
+            prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def reset_multiproc_dir():
+    """Delete the sample files a previous run left in
+    ``PROMETHEUS_MULTIPROC_DIR``. Call once, before any process of this
+    container starts recording."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+
+
+def start_metrics_server(port: int):
+    """Serve this host's samples on ``port``, for processes (the Celery
+    worker) that have no HTTP server of their own."""
+    if prometheus_client is None:
+        return
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    prometheus_client.start_http_server(port, registry=registry)
+
+
+def init_worker_metrics():
+    """Start recording afresh and, if ``METRICS_PORT`` is set, serve the
+    samples on it. Called once per container by the processes that run
+    tasks: the Celery worker (before its pool forks) and app.dispatcher."""
+    reset_multiproc_dir()
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        start_metrics_server(int(port))
+
+
+def mark_process_dead():
+    if prometheus_client is not None and \
+            "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def instrument_engine(engine, name: str):
+    """Time every statement run on ``engine`` (a sync ``Engine``; pass
+    ``AsyncEngine.sync_engine`` for the async one)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context,
+                             executemany):
+        start = conn.info["query_start"].pop()
+        DB_QUERY_DURATION.labels(engine=name).observe(
+            time.perf_counter() - start
+        )
+
+
+async def on_canvas_request(request):
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+async def on_canvas_response(response):
+    request = response.request
+    start = request.extensions.get("metrics_start")
+    if start is not None:
+        CANVAS_REQUEST_DURATION.labels(method=request.method).observe(
+            time.perf_counter() - start
+        )
+    CANVAS_REQUESTS.labels(method=request.method,
+                           status=response.status_code).inc()
+
+
+def instrument_celery():
+    """Connect task timing, queue delay and failure counters to Celery's
+    signals. The publisher stamps each message with its send time so queue
+    delay can be measured for tasks without an ETA."""
+    from datetime import datetime, timezone
+
+    from celery.signals import before_task_publish, task_prerun, \
+        task_postrun, task_failure, worker_init
+
+    started: dict[str, float] = {}
+
+    @worker_init.connect(weak=False)
+    def on_worker_init(**kwargs):
+        # Runs in the worker's main process before the pool forks.
+        init_worker_metrics()
+
+    @before_task_publish.connect(weak=False)
+    def stamp_sent_at(headers=None, **kwargs):
+        if headers is not None:
+            headers.setdefault("sent_at", time.time())
+
+    @task_prerun.connect(weak=False)
+    def on_prerun(task_id=None, task=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+        due = getattr(task.request, "sent_at", None) or \
+            (getattr(task.request, "headers", None) or {}).get("sent_at")
+        eta = task.request.eta
+        if eta:
+            eta = datetime.fromisoformat(eta) if isinstance(eta, str) else eta
+            if eta.tzinfo is None:
+                eta = eta.replace(tzinfo=timezone.utc)
+            due = eta.timestamp()
+        if due is not None:
+            TASK_QUEUE_DELAY.labels(task=task.name).observe(
+                max(0.0, time.time() - due)
+            )
+
+    @task_postrun.connect(weak=False)
+    def on_postrun(task_id=None, task=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is not None:
+            TASK_DURATION.labels(task=task.name).observe(
+                time.perf_counter() - start
+            )
+
+    @task_failure.connect(weak=False)
+    def on_failure(sender=None, **kwargs):
+        TASK_FAILURES.labels(task=sender.name).inc()
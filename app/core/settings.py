@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, computed_field
 
@@ -9,12 +11,33 @@ class Settings(BaseSettings):
 
     SECRET: str
 
+    USER_CACHE_TTL: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    PROFILING_QUERY_BUDGET: int = 20
+    PROFILING_MAX_REPORTS: int = 50
+
     DB_PORT: int
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
     DB_HOST: str
 
+    # Engine profile ("dev" or "prod"); any DB_* option below that is set
+    # overrides the profile's value. DB_SYNC_* size the Celery worker's pool.
+    DB_PROFILE: Literal["dev", "prod"] = "dev"
+    DB_ECHO: bool | None = None
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_SYNC_POOL_SIZE: int | None = None
+    DB_SYNC_MAX_OVERFLOW: int | None = None
+    DB_POOL_PRE_PING: bool | None = None
+    DB_POOL_RECYCLE: int | None = None
+    DB_POOL_TIMEOUT: float | None = None
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Milliseconds; 0 disables the per-statement timeout.
+    DB_STATEMENT_TIMEOUT: int = 0
+
     CELERY_BROKER_URL: str
     CELERY_BACKEND_URL: str
 
@@ -22,6 +45,88 @@ class Settings(BaseSettings):
 
     FROM_EMAIL: str
     GMAIL_APP_PASSWORD: str
+    AWS_REGION: str | None = None
+
+    # Point these at a local sink (e.g. SMTP_HOST=localhost SMTP_PORT=1025
+    # SMTP_USE_SSL=false GMAIL_APP_PASSWORD=) to send without logging in.
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 465
+    SMTP_USE_SSL: bool = True
+    SMTP_USERNAME: str | None = None
+    SMTP_PASSWORD: str | None = None
+    SMTP_POOL_SIZE: int = 2
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = 100
+    SMTP_KEEPALIVE_INTERVAL: float = 30.0
+    SMTP_TIMEOUT: float = 10.0
+
+    DISPATCHER_CONCURRENCY: int = 200
+    DISPATCHER_RATE: float = 10.0
+    DISPATCHER_BURST: int = 20
+    DISPATCHER_MAX_RETRIES: int = 5
+    DISPATCHER_BACKOFF: float = 30.0
+    DISPATCHER_MAX_BACKOFF: float = 600.0
+
+    CANVAS_BASE_URL: str = "https://sdsu.instructure.com"
+    CANVAS_MAX_CONNECTIONS: int = 100
+    CANVAS_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    CANVAS_KEEPALIVE_EXPIRY: float = 30.0
+    CANVAS_HTTP2: bool = False
+    CANVAS_CONNECT_TIMEOUT: float = 5.0
+    CANVAS_READ_TIMEOUT: float = 15.0
+    CANVAS_WRITE_TIMEOUT: float = 5.0
+    CANVAS_POOL_TIMEOUT: float = 5.0
+    CANVAS_GOVERNOR_INITIAL_CONCURRENCY: int = 4
+    CANVAS_GOVERNOR_MAX_CONCURRENCY: int = 16
+    CANVAS_GOVERNOR_LOW_WATERMARK: float = 150.0
+    CANVAS_GOVERNOR_HIGH_WATERMARK: float = 400.0
+    CANVAS_GOVERNOR_MAX_RETRIES: int = 4
+    CANVAS_GOVERNOR_BACKOFF: float = 1.0
+    CANVAS_GOVERNOR_MAX_WAIT: float = 30.0
+
+    CANVAS_CACHE_TTL: int = 60
+    CANVAS_CACHE_STALE_TTL: int = 3600
+    CANVAS_CACHE_MAX_ENTRIES: int = 1024
+    CANVAS_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CANVAS_CACHE_REDIS_URL: str | None = None
+
+    CANVAS_SYNC_INTERVAL: int = 15 * 60
+    # Users with a Canvas token are split into this many shards; each shard is
+    # one Celery task syncing up to CANVAS_SYNC_CONCURRENCY users at a time.
+    CANVAS_SYNC_SHARDS: int = 16
+    CANVAS_SYNC_CONCURRENCY: int = 20
+    CANVAS_SYNC_BATCH_SIZE: int = 200
+    # An unfinished shard whose checkpoint is older than this is presumed
+    # crashed and is resumed by the next run.
+    CANVAS_SYNC_SHARD_LEASE: int = 300
+
+    # "eta" publishes each reminder as a Celery ETA task when it is scheduled;
+    # "database" keeps it in the reminders table until app.scheduler claims it.
+    REMINDER_SCHEDULER: Literal["eta", "database"] = "eta"
+    SCHEDULER_BATCH_SIZE: int = 500
+    SCHEDULER_POLL_INTERVAL: float = 5.0
+    # A reminder still pending this many seconds after it was dispatched (and
+    # after it fell due) is presumed lost with its message and dispatched
+    # again; a duplicate message finds the row already sent and does nothing.
+    SCHEDULER_DISPATCH_LEASE: int = 15 * 60
+    # Pending reminders of one user that fire within this many seconds of each
+    # other are sent as a single digest email; 0 disables coalescing.
+    REMINDER_DIGEST_WINDOW: int = 15 * 60
+    # A reminder whose email keeps failing is retried with exponential
+    # backoff (seconds, doubling per attempt) and then marked failed.
+    REMINDER_SEND_MAX_RETRIES: int = 5
+    REMINDER_SEND_RETRY_BACKOFF: int = 60
+    REMINDER_SEND_MAX_BACKOFF: int = 60 * 60
+
+    REMINDER_RETENTION_DAYS: int = 7
+    REMINDER_ARCHIVE_BATCH_SIZE: int = 1000
+    REMINDER_ARCHIVE_MAX_BATCHES: int = 100
+    REMINDER_ARCHIVE_INTERVAL: int = 60 * 60
+
+    # "postgres" delivers reminder events from every process via
+    # LISTEN/NOTIFY; "memory" only sees events raised by the API process.
+    REMINDER_EVENTS_BACKEND: Literal["postgres", "memory"] = "postgres"
+    REMINDER_EVENTS_QUEUE_SIZE: int = 100
+    REMINDER_EVENTS_KEEPALIVE: float = 15.0
 
     @computed_field
     @property
@@ -0,0 +1,259 @@
+"""Asyncio worker mode for the email tasks.
+
+Consumes Celery messages from one queue and runs up to
+``DISPATCHER_CONCURRENCY`` of them at a time on a single event loop, gated by
+a process-wide token bucket so we stay under the SMTP provider's send rate.
+Sends rejected with a throttling reply, and tasks that hit a database error
+(the pool timing out, say), are backed off and retried, and are handed back
+to the broker rather than dropped if they keep failing::
+
+    python -m app.dispatcher --queue reminders
+
+It only runs with ``REMINDER_SCHEDULER=database``, where app.scheduler
+publishes reminders as they fall due. A message with a future ETA is held,
+unacknowledged, until it is due, and with ETA-published reminders those
+would soon fill the prefetch window and stall the queue.
+
+The blocking SMTP work itself runs in a thread pool of the same size, so
+raise ``SMTP_POOL_SIZE`` alongside ``DISPATCHER_CONCURRENCY`` to keep the
+connections warm. ``send_notification`` also holds a sync database session
+across the send, so concurrency is capped at the sync pool's size plus
+overflow; raise ``DB_SYNC_POOL_SIZE`` too.
+"""
+import argparse
+import asyncio
+import queue
+import random
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+
+from kombu import Queue
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.celery import celery
+from app.core import settings
+from app.core.database import engine_kwargs
+from app.core.metrics import init_worker_metrics
+from app import tasks
+from app.mail import is_throttled
+
+EMAIL_TASKS = {
+    tasks.send_notification.name,
+    tasks.send_verification_email.name,
+    tasks.send_password_reset_email.name,
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for ``seconds``; used when the provider
+        starts throttling, since every sender would be rejected anyway."""
+        self._paused_until = max(self._paused_until,
+                                 time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class ConsumerThread(threading.Thread):
+    """Owns the broker connection. Kombu channels are not thread-safe, so
+    acks and requeues requested by the event loop are queued here and
+    carried out between ``drain_events`` calls."""
+
+    def __init__(self, queue_name: str, prefetch_count: int,
+                 loop: asyncio.AbstractEventLoop, inbox: asyncio.Queue):
+        super().__init__(daemon=True)
+        self._queue = celery.amqp.queues.get(queue_name) or Queue(queue_name)
+        self._prefetch_count = prefetch_count
+        self._loop = loop
+        self._inbox = inbox
+        self._outbox = queue.SimpleQueue()
+        self._stopped = threading.Event()
+
+    def run(self):
+        with celery.connection_for_read() as conn:
+            with conn.Consumer(self._queue, callbacks=[self._on_message],
+                               prefetch_count=self._prefetch_count,
+                               accept=["json"]):
+                while not self._stopped.is_set():
+                    self._settle()
+                    try:
+                        conn.drain_events(timeout=0.1)
+                    except socket.timeout:
+                        pass
+                self._settle()
+
+    def _on_message(self, body, message):
+        self._loop.call_soon_threadsafe(self._inbox.put_nowait,
+                                        (body, message))
+
+    def _settle(self):
+        while True:
+            try:
+                action, message = self._outbox.get_nowait()
+            except queue.Empty:
+                return
+            getattr(message, action)()
+
+    def ack(self, message):
+        self._outbox.put(("ack", message))
+
+    def requeue(self, message):
+        self._outbox.put(("requeue", message))
+
+    def stop(self):
+        self._stopped.set()
+
+
+class Dispatcher:
+    def __init__(self, queue_name: str,
+                 concurrency: int = settings.DISPATCHER_CONCURRENCY,
+                 rate: float = settings.DISPATCHER_RATE,
+                 burst: int = settings.DISPATCHER_BURST,
+                 max_retries: int = settings.DISPATCHER_MAX_RETRIES,
+                 backoff: float = settings.DISPATCHER_BACKOFF):
+        pool = engine_kwargs(is_async=False)
+        pool_capacity = pool["pool_size"] + pool["max_overflow"]
+        if concurrency > pool_capacity:
+            # More threads than connections would only time out at checkout.
+            print(f"Concurrency {concurrency} capped at the sync database "
+                  f"pool's {pool_capacity} connections")
+            concurrency = pool_capacity
+        self._queue_name = queue_name
+        self._concurrency = concurrency
+        self._bucket = TokenBucket(rate, burst)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._executor = ThreadPoolExecutor(concurrency)
+        self._consumer = None
+        self._pending: set[asyncio.Task] = set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        inbox = asyncio.Queue()
+        self._consumer = ConsumerThread(self._queue_name, self._concurrency,
+                                        loop, inbox)
+        self._consumer.start()
+
+        stopped = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+
+        while not stopped.is_set():
+            try:
+                body, message = await asyncio.wait_for(inbox.get(), 1.0)
+            except asyncio.TimeoutError:
+                continue
+            task = asyncio.create_task(self._handle(body, message))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+        # Unstarted and unfinished messages are redelivered by the broker
+        # once the connection closes.
+        for task in self._pending:
+            task.cancel()
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        self._consumer.stop()
+        self._consumer.join()
+        self._executor.shutdown()
+
+    def _retry_delay(self, attempt: int) -> float:
+        delay = min(self._backoff * 2 ** attempt,
+                    settings.DISPATCHER_MAX_BACKOFF)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _handle(self, body, message):
+        name = message.headers.get("task")
+        task = celery.tasks.get(name)
+        if task is None:
+            print(f"Dropping message for unknown task {name}")
+            self._consumer.ack(message)
+            return
+
+        args, kwargs, _ = body
+        # Only stragglers published before switching to the database
+        # scheduler still carry an ETA.
+        eta = message.headers.get("eta")
+        if eta:
+            eta = datetime.fromisoformat(eta)
+            if eta.tzinfo is None:
+                eta = eta.replace(tzinfo=timezone.utc)
+            delay = (eta - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        loop = asyncio.get_running_loop()
+        # The message headers carry sent_at, for the queue delay metric.
+        run = partial(task.apply, args=args, kwargs=kwargs,
+                      task_id=message.headers.get("id"),
+                      headers=message.headers)
+        for attempt in range(self._max_retries + 1):
+            if name in EMAIL_TASKS:
+                await self._bucket.acquire()
+            result = await loop.run_in_executor(self._executor, run)
+            if result.successful():
+                break
+            throttled = is_throttled(result.result)
+            if not throttled and \
+                    not isinstance(result.result, SQLAlchemyError):
+                break
+            if attempt < self._max_retries:
+                delay = self._retry_delay(attempt)
+                reason = "throttled" if throttled else "database error"
+                print(f"{name}[{run.keywords['task_id']}] {reason}, "
+                      f"retrying in {delay:.0f}s")
+                if throttled:
+                    self._bucket.pause(delay)
+                await asyncio.sleep(delay)
+        else:
+            # Still failing: give the message back instead of losing it.
+            self._consumer.requeue(message)
+            return
+
+        if result.failed():
+            print(f"{name}[{run.keywords['task_id']}] failed: {result.result!r}")
+        self._consumer.ack(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queue", default="reminders")
+    args = parser.parse_args()
+    if settings.REMINDER_SCHEDULER != "database":
+        parser.error("requires REMINDER_SCHEDULER=database")
+    # Celery's worker_init never fires here, so the task metrics recorded by
+    # app.core.metrics' signal handlers are exposed explicitly.
+    init_worker_metrics()
+    asyncio.run(Dispatcher(args.queue).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Reminder lifecycle events for the ``/reminders/events`` stream.
+
+Writers (the scheduling endpoints and the Celery worker) call
+``notify_stmt`` inside the transaction that changes the reminders, so an
+event is only delivered if that transaction commits. In the API process a
+single ``EventBroker`` task ``LISTEN``s on the channel and fans each event
+out to the open streams of its user.
+
+With ``REMINDER_EVENTS_BACKEND=memory`` nothing goes through Postgres: the
+API hands events to its own subscribers when the session commits (and drops
+them on rollback), so events raised in other
+processes (the worker's ``sent``/``failed``) are not seen. That mode is
+meant for a single API process in development.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from typing import Iterable, Optional
+
+import orjson
+from pydantic import PostgresDsn
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+
+from app.core import settings
+
+CHANNEL = "reminder_events"
+# Session.info key of the payloads a memory-mode publish is holding back
+# until commit.
+PENDING_KEY = "reminder_events"
+# NOTIFY payloads are limited to 8000 bytes; this many task ids stay well
+# under it.
+MAX_TASK_IDS = 100
+
+SCHEDULED = "scheduled"
+SENT = "sent"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def event_payloads(user_id: uuid.UUID, event: str,
+                   task_ids: Iterable[uuid.UUID]) -> list[str]:
+    task_ids = [str(task_id) for task_id in task_ids]
+    return [
+        orjson.dumps({
+            "user_id": str(user_id),
+            "event": event,
+            "task_ids": task_ids[i:i + MAX_TASK_IDS],
+        }).decode()
+        for i in range(0, len(task_ids), MAX_TASK_IDS)
+    ]
+
+
+def notify_stmt(user_id: uuid.UUID, event: str,
+                task_ids: Iterable[uuid.UUID]):
+    """One statement sending the event (in chunks) on commit; ``None`` if
+    there are no task ids."""
+    payloads = event_payloads(user_id, event, task_ids)
+    if not payloads:
+        return None
+    return select(*(func.pg_notify(CHANNEL, payload) for payload in payloads))
+
+
+class EventBroker:
+    """Per-user fan-out of reminder events to connected streams.
+
+    Each subscriber is a bounded queue; a client that stops reading loses
+    events rather than holding memory, and can re-read
+    ``/active/reminders`` to catch up.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self._queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def uses_postgres(self) -> bool:
+        return settings.REMINDER_EVENTS_BACKEND == "postgres"
+
+    def init(self):
+        if self.uses_postgres and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, session, user_id: uuid.UUID, event: str,
+                      task_ids: Iterable[uuid.UUID]):
+        """Raise an event from the API; call before committing ``session``."""
+        if self.uses_postgres:
+            stmt = notify_stmt(user_id, event, task_ids)
+            if stmt is not None:
+                await session.execute(stmt)
+        else:
+            session.info.setdefault(PENDING_KEY, []).extend(
+                event_payloads(user_id, event, task_ids)
+            )
+
+    def subscribe(self, user_id: uuid.UUID) -> asyncio.Queue:
+        queue = asyncio.Queue(self._queue_size)
+        self._subscribers[str(user_id)].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: uuid.UUID, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(str(user_id))
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[str(user_id)]
+
+    def _deliver(self, payload: str):
+        try:
+            event = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            return
+        for queue in self._subscribers.get(event.get("user_id"), ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    async def _listen(self):
+        dsn = PostgresDsn.build(
+            scheme="postgresql",
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            username=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            path=settings.DB_NAME,
+        ).unicode_string()
+
+        # Any failure, not just a refused connection, is retried: if this
+        # task dies the API keeps serving streams that never see an event.
+        backoff = 1.0
+        while True:
+            try:
+                await self._listen_once(dsn)
+            except Exception as e:
+                print(f"Reminder events: listener failed ({e!r}), "
+                      f"retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            else:
+                print("Reminder events: connection lost, reconnecting")
+                backoff = 1.0
+
+    async def _listen_once(self, dsn: str):
+        """Deliver events until the connection is lost."""
+        import asyncpg
+
+        conn = await asyncpg.connect(dsn)
+        try:
+            lost = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(
+                lambda _: lost.done() or lost.set_result(None)
+            )
+            await conn.add_listener(
+                CHANNEL, lambda _conn, _pid, _channel, payload:
+                self._deliver(payload)
+            )
+            await lost
+        finally:
+            if not conn.is_closed():
+                conn.terminate()
+
+
+broker = EventBroker(settings.REMINDER_EVENTS_QUEUE_SIZE)
+
+
+# An AsyncSession commits through its sync Session, so these also see the
+# API's sessions.
+@event.listens_for(Session, "after_commit")
+def deliver_committed(session):
+    for payload in session.info.pop(PENDING_KEY, ()):
+        broker._deliver(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def drop_rolled_back(session):
+    session.info.pop(PENDING_KEY, None)
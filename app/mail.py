@@ -0,0 +1,172 @@
+import functools
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Optional
+
+from app.core import settings
+
+# Errors after which the connection is gone and a fresh one may succeed.
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError,
+                    TimeoutError)
+
+# SMTP replies that mean "slow down" rather than "this message is bad".
+THROTTLE_CODES = {421, 450, 451, 452, 454}
+
+
+def is_throttled(exc: BaseException) -> bool:
+    return isinstance(exc, smtplib.SMTPResponseException) and \
+        exc.smtp_code in THROTTLE_CODES
+
+
+class PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPPool:
+    """Keeps authenticated SMTP connections open between messages.
+
+    Pooled connections that sat idle longer than ``keepalive_interval`` are
+    checked with NOOP before reuse, and a connection is retired after
+    ``max_messages`` sends. The pool resets itself after a fork, so each
+    worker process owns its own connections.
+    """
+
+    def __init__(self, host: str, port: int, use_ssl: bool = True,
+                 username: Optional[str] = None,
+                 password: Optional[str] = None,
+                 size: int = 2, max_messages: int = 100,
+                 keepalive_interval: float = 30.0, timeout: float = 10.0):
+        self._host = host
+        self._port = port
+        self._use_ssl = use_ssl
+        self._username = username
+        self._password = password
+        self._max_messages = max_messages
+        self._keepalive_interval = keepalive_interval
+        self._timeout = timeout
+        self._size = size
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._idle: queue.LifoQueue[PooledConnection] = queue.LifoQueue(size)
+
+    def _connect(self) -> PooledConnection:
+        smtp_class = smtplib.SMTP_SSL if self._use_ssl else smtplib.SMTP
+        smtp = smtp_class(self._host, self._port, timeout=self._timeout)
+        if self._password:
+            smtp.login(self._username, self._password)
+        return PooledConnection(smtp)
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Sockets inherited from the parent are not ours to use.
+                    self._idle = queue.LifoQueue(self._size)
+                    self._pid = os.getpid()
+
+    def _is_usable(self, conn: PooledConnection) -> bool:
+        if conn.sent >= self._max_messages:
+            return False
+        if time.monotonic() - conn.last_used < self._keepalive_interval:
+            return True
+        try:
+            return conn.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self) -> PooledConnection:
+        self._check_fork()
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._is_usable(conn):
+                return conn
+            conn.close()
+
+    def release(self, conn: PooledConnection):
+        conn.last_used = time.monotonic()
+        if conn.sent >= self._max_messages:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def discard(self, conn: PooledConnection):
+        conn.smtp.close()
+
+    def send(self, msg: EmailMessage):
+        conn = self.acquire()
+        try:
+            conn.smtp.send_message(msg)
+        except RECONNECT_ERRORS:
+            # The server dropped an otherwise healthy-looking connection;
+            # retry once on a new one.
+            self.discard(conn)
+            conn = self._connect()
+            try:
+                conn.smtp.send_message(msg)
+            except Exception:
+                self.discard(conn)
+                raise
+        except Exception:
+            self.discard(conn)
+            raise
+        conn.sent += 1
+        self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+smtp_pool = SMTPPool(
+    settings.SMTP_HOST,
+    settings.SMTP_PORT,
+    use_ssl=settings.SMTP_USE_SSL,
+    username=settings.SMTP_USERNAME or settings.FROM_EMAIL,
+    password=settings.SMTP_PASSWORD or settings.GMAIL_APP_PASSWORD,
+    size=settings.SMTP_POOL_SIZE,
+    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+    keepalive_interval=settings.SMTP_KEEPALIVE_INTERVAL,
+    timeout=settings.SMTP_TIMEOUT,
+)
+
+
+def send_email(to_email: str, subject: str, body: str):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = settings.FROM_EMAIL
+    msg["To"] = to_email
+    msg.set_content(body)
+
+    smtp_pool.send(msg)
+
+
+@functools.cache
+def get_ses_client():
+    """SES client, built on first use so boto3/botocore are only imported
+    by processes that actually send through SES."""
+    import boto3
+
+    return boto3.client("ses", region_name=settings.AWS_REGION)
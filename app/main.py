@@ -1,28 +1,45 @@
+import asyncio
+import time
+import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional
 
 import httpx
-from fastapi.responses import ORJSONResponse
+import orjson
+from fastapi.responses import ORJSONResponse, Response, PlainTextResponse, \
+    StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text, and_
-from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy import text, and_, or_
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from fastapi.requests import Request
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from celery.result import AsyncResult
+from sqlalchemy import select, delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.schemas import UserCreate, UserRead, UserUpdate, TaskSchema, \
-    ReminderSchema
+    ReminderSchema, BatchScheduleResult
 from app.users import auth_backend, current_active_user, fastapi_users, \
-    current_verified_user
-from .celery import celery
+    current_verified_user, current_superuser, user_cache
 
 
-from .core import sessionmanager, get_db
-from .models import User, CanvasToken, Reminder, ReminderStatus
-from .tasks import send_notification
+from .canvas import canvas_manager, get_canvas_client, CanvasError, \
+    PlannerCache, planner_cache, get_planner_cache, sync_user_assignments
+from .canvas.context import CanvasContext, get_canvas_context, \
+    load_canvas_context
+from .core import sessionmanager, get_db, settings
+from . import events
+from .versions import bump_versions_stmt, etag_headers, get_version, \
+    make_etag, not_modified
+from .core.metrics import HTTP_REQUEST_DURATION, mark_process_dead, \
+    render as render_metrics
+from .profiling import profiling_middleware, instrument_query_accounting, \
+    reports as profiling_reports
+from .models import User, CanvasToken, Reminder, ReminderStatus, Assignment
+from .celery import celery, publish_notifications
 
 
 @asynccontextmanager
@@ -31,10 +48,19 @@ async def lifespan(app: FastAPI):
     async with sessionmanager.connect() as conn:
         await conn.execute(text("SELECT 1"))
 
+    canvas_manager.init()
+    events.broker.init()
+
     yield
 
+    await events.broker.close()
+    await canvas_manager.close()
+    await planner_cache.close()
+
     if sessionmanager._engine is not None:
         await sessionmanager.close()
+
+    mark_process_dead()
 app = FastAPI(lifespan=lifespan, response_class=ORJSONResponse,
               docs_url="/dev/api/docs", root_path="/api/v1")
 
@@ -56,6 +82,49 @@ app.add_middleware(
 
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code
+    ).observe(time.perf_counter() - start)
+    return response
+
+
+app.middleware("http")(profiling_middleware)
+instrument_query_accounting(sessionmanager._engine.sync_engine)
+
+
+@app.get(
+    "/admin/profiles/{report_id}",
+    response_class=PlainTextResponse,
+    description="Profile report of a request sent with X-Profile: 1."
+)
+async def get_profile_report(report_id: str,
+                             user: User = Depends(current_superuser)):
+    report = profiling_reports.get(report_id)
+    if report is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Report not found; it may belong to another worker."
+        )
+    return report
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    rendered = render_metrics()
+    if rendered is None:
+        raise HTTPException(status_code=503,
+                            detail="prometheus-client is not installed")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
+
+
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     return ORJSONResponse(
@@ -64,6 +133,14 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
+@app.get(
+    "/admin/db/pool",
+    description="Live connection pool stats of this API process."
+)
+async def get_pool_stats(user: User = Depends(current_superuser)):
+    return sessionmanager.pool_stats()
+
+
 @app.delete(
     "/users/delete",
     status_code=204,
@@ -75,16 +152,15 @@ async def delete_user_account(
 ):
     await session.delete(user)
     await session.commit()
+    user_cache.invalidate(user.id)
     return
 
 @app.post("/save/token")
 async def save_token(token: str,
                      session: AsyncSession = Depends(get_db),
-                     user: User = Depends(current_verified_user)):
-    result = await session.execute(
-        select(CanvasToken).where(CanvasToken.user_id == user.id)
-    )
-    existing_token = result.scalar_one_or_none()
+                     context: CanvasContext = Depends(get_canvas_context)):
+    user = context.user
+    existing_token = context.canvas_token
 
     if existing_token:
         existing_token.token = token
@@ -93,83 +169,95 @@ async def save_token(token: str,
         session.add(token)
 
     await session.commit()
+    await run_in_threadpool(celery.send_task, "app.tasks.sync_assignments",
+                            args=[str(user.id)])
     return {"message": "Token saved"}
 
 
+# The assignment window moves with the clock, so its ETag also changes at
+# least this often (seconds) even when nothing was written.
+ASSIGNMENTS_ETAG_PERIOD = 60
+
+
 @app.get("/upcoming/assignments")
 async def get_assignments(
+        request: Request,
+        refresh: bool = False,
         session: AsyncSession = Depends(get_db),
+        client: httpx.AsyncClient = Depends(get_canvas_client),
+        cache: PlannerCache = Depends(get_planner_cache),
         user: User = Depends(current_verified_user)):
-    result = await session.execute(
-        select(CanvasToken).where(CanvasToken.user_id == user.id)
+    if refresh:
+        context = await load_canvas_context(session, user)
+        token = context.canvas_token
+        if token is None:
+            raise HTTPException(status_code=404,
+                                detail="No Canvas token found")
+        try:
+            # Asks Canvas even within CANVAS_CACHE_TTL; the stored ETags
+            # still spare unchanged pages.
+            await sync_user_assignments(session.execute, client, user.id,
+                                        token.token, cache, force=True)
+        except CanvasError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        await session.commit()
+
+    now = datetime.now(timezone.utc)
+    # Read before the listing, so a concurrent write can only make the tag
+    # older than the data, never newer.
+    etag = make_etag("assignments", await get_version(session, user.id),
+                     int(now.timestamp()) // ASSIGNMENTS_ETAG_PERIOD)
+    if not refresh:
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+    pending = select(Reminder.id).where(
+        and_(
+            Reminder.user_id == user.id,
+            Reminder.plannable_id == Assignment.plannable_id,
+            Reminder.status == ReminderStatus.pending
+        )
     )
-    token = result.scalar_one_or_none()
-    if token is None:
-        raise HTTPException(status_code=404,
-                            detail="No Canvas token found")
-    now = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
-    end = (datetime.now(timezone.utc) + timedelta(days=14)).isoformat()
-
-    url = f"https://sdsu.instructure.com/"
-    headers = {"Authorization": f"Bearer {token.token}"}
-
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{url}/api/v1/planner/items",
-            params={
-                "start_date": now,
-                "end_date": end
-            },
-            headers=headers
+    stmt = select(
+        Assignment.plannable_id,
+        Assignment.name,
+        Assignment.deadline,
+        Assignment.course,
+        Assignment.submitted,
+        Assignment.graded,
+        Assignment.points_possible,
+    ).where(
+        and_(
+            Assignment.user_id == user.id,
+            Assignment.deadline >= now + timedelta(hours=1),
+            Assignment.deadline <= now + timedelta(days=14),
+            ~pending.exists()
         )
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid token"
-            )
-        elif response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=response.json()["message"]
-            )
-
-        planner_items = response.json()
-        assignments = []
+    ).order_by(Assignment.deadline)
+    result = await session.execute(stmt)
 
-        stmt = select(Reminder.plannable_id).where(
-            and_(
-                Reminder.user_id == user.id,
-                Reminder.status == ReminderStatus.pending
-            )
-        )
-        user_reminders = set(await session.scalars(stmt))
-
-        for item in planner_items:
-            if item.get('plannable_id') not in user_reminders:
-                if item.get("plannable_type") == "assignment":
-                    plannable = item.get("plannable", {})
-                    submission = item.get("submissions", {})
-                    assignments.append({
-                        "plannable_id": item.get("plannable_id"),
-                        "name": plannable.get("title"),
-                        "deadline": plannable.get("due_at"),
-                        "course": item.get("context_name"),
-                        "submitted": submission.get("submitted"),
-                        "graded": submission.get("graded"),
-                        "points_possible": item.get("plannable").get("points_possible")
-                    })
-
-    return assignments
+    # Returned as a response directly so FastAPI skips jsonable_encoder and
+    # orjson serializes the rows (datetimes included) in one pass.
+    return ORJSONResponse([row._asdict() for row in result],
+                          headers=etag_headers(etag))
 
 @app.get("/active/reminders",
          response_model=List[ReminderSchema],
          status_code=200,
          description="Get reminder statuses for user.")
 async def get_reminders(
+        request: Request,
+        response: Response,
         session: AsyncSession = Depends(get_db),
         user: User = Depends(current_verified_user)
 ):
+    etag = make_etag("reminders", await get_version(session, user.id))
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers.update(etag_headers(etag))
+
     stmt = select(Reminder).where(
         and_(
             Reminder.user_id == user.id,
@@ -181,34 +269,79 @@ async def get_reminders(
     return reminders.scalars().all()
 
 
+@app.get("/reminders/events",
+         response_class=StreamingResponse,
+         description="Stream the user's reminder lifecycle events (SSE).")
+async def reminder_events(
+        request: Request,
+        session: AsyncSession = Depends(get_db),
+        user: User = Depends(current_verified_user),
+):
+    # The stream can stay open for hours; hand the session (and any pooled
+    # connection authentication used) back before it starts.
+    await session.close()
+    user_id = user.id
+
+    async def stream():
+        queue = events.broker.subscribe(user_id)
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), settings.REMINDER_EVENTS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: " + event["event"].encode() + \
+                    b"\ndata: " + orjson.dumps(event["task_ids"]) + b"\n\n"
+        finally:
+            events.broker.unsubscribe(user_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache",
+                                      "X-Accel-Buffering": "no"})
+
+
 @app.delete("/delete/reminder",
             status_code=204,
             description="Delete reminder by its ID.")
 async def delete_reminder(
-        task_id: str = Query(..., min_length=1),
+        task_id: uuid.UUID = Query(...),
         session: AsyncSession = Depends(get_db),
         user: User = Depends(current_verified_user),
 ):
-    task_result = AsyncResult(task_id, app=celery)
-
-    if task_result.state in {"SUCCESS", "FAILURE", "REVOKED"}:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot cancel task. Current state: {task_result.state}"
-        )
-
-    task_result.revoke(terminate=True)
-
-    stmt = delete(Reminder).where(
+    # Cancellation is a single indexed write; send_notification only sends
+    # reminders it can still claim as pending, so no revoke is broadcast.
+    stmt = update(Reminder).where(
         and_(
             Reminder.user_id == user.id,
-            Reminder.task_id == task_id
+            Reminder.task_id == task_id,
+            Reminder.status == ReminderStatus.pending
         )
-    )
+    ).values(status=ReminderStatus.cancelled)
     db_result = await session.execute(stmt)
+    if db_result.rowcount:
+        await session.execute(bump_versions_stmt([user.id]))
+        await events.broker.publish(session, user.id, events.CANCELLED,
+                                    [task_id])
     await session.commit()
 
     if db_result.rowcount == 0:
+        status = await session.scalar(
+            select(Reminder.status).where(
+                and_(
+                    Reminder.user_id == user.id,
+                    Reminder.task_id == task_id
+                )
+            )
+        )
+        if status is not None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot cancel task. Current state: {status.value}"
+            )
         raise HTTPException(
             status_code=404,
             detail="Reminder not found or not authorized."
@@ -216,6 +349,116 @@ async def delete_reminder(
 
     return
 
+async def schedule_reminders(
+        session: AsyncSession,
+        user: User,
+        entries: list[tuple[TaskSchema, datetime]],
+        keys: Optional[list[Optional[str]]] = None,
+) -> tuple[list[uuid.UUID], dict[str, Exception]]:
+    """Create one reminder per ``(task, fire_at)`` entry.
+
+    Rows are written with a single multi-row ``INSERT ... ON CONFLICT DO
+    NOTHING``. An entry whose assignment already has a pending reminder, or
+    whose idempotency key (``keys``, parallel to ``entries``) was seen before,
+    gets the existing reminder's task id and is not published again. In
+    ``eta`` scheduler mode the new rows' Celery messages are then published
+    over one broker connection; in ``database`` mode the dispatcher picks the
+    rows up once they are due.
+    Returns the task ids in entry order and the publish errors by task id.
+    """
+    keys = keys or [None] * len(entries)
+    task_ids = [uuid.uuid4() for _ in entries]
+    # ETA-published reminders are marked dispatched up front so a dispatcher
+    # running alongside only picks them up if their message is lost.
+    deferred = settings.REMINDER_SCHEDULER == "database"
+    dispatched_at = None if deferred else datetime.now(timezone.utc)
+
+    inserted = set((await session.execute(
+        pg_insert(Reminder).values([
+            {
+                "plannable_id": task.plannable_id,
+                "task_id": task_id,
+                "user_id": user.id,
+                "course_name": task.course_name,
+                "assignment_name": task.assignment_name,
+                "deadline": task.deadline,
+                "fire_at": fire_at,
+                "dispatched_at": dispatched_at,
+                "idempotency_key": key,
+            }
+            for task_id, (task, fire_at), key in zip(task_ids, entries, keys)
+        ])
+        .on_conflict_do_nothing()
+        .returning(Reminder.task_id)
+    )).scalars())
+
+    errors: dict[str, Exception] = {}
+    new = [i for i, task_id in enumerate(task_ids) if task_id in inserted]
+    skipped = [i for i, task_id in enumerate(task_ids)
+               if task_id not in inserted]
+    if skipped:
+        existing = await session.execute(
+            select(Reminder.task_id, Reminder.plannable_id,
+                   Reminder.idempotency_key, Reminder.status)
+            .where(
+                and_(
+                    Reminder.user_id == user.id,
+                    or_(
+                        Reminder.idempotency_key.in_(
+                            [keys[i] for i in skipped if keys[i]]
+                        ),
+                        and_(
+                            Reminder.status == ReminderStatus.pending,
+                            Reminder.plannable_id.in_(
+                                [entries[i][0].plannable_id for i in skipped]
+                            )
+                        )
+                    )
+                )
+            )
+        )
+        by_key, by_plannable = {}, {}
+        for row in existing:
+            if row.idempotency_key is not None:
+                by_key[row.idempotency_key] = row.task_id
+            if row.status == ReminderStatus.pending:
+                by_plannable[row.plannable_id] = row.task_id
+
+        for i in skipped:
+            task_id = by_key.get(keys[i]) or \
+                by_plannable.get(entries[i][0].plannable_id)
+            if task_id is None:
+                # The conflicting reminder finished or was cancelled between
+                # the insert and this lookup.
+                errors[str(task_ids[i])] = Exception("Reminder conflict")
+            else:
+                task_ids[i] = task_id
+    if new:
+        await session.execute(bump_versions_stmt([user.id]))
+    await events.broker.publish(session, user.id, events.SCHEDULED,
+                                [task_ids[i] for i in new])
+    await session.commit()
+
+    if deferred or not new:
+        return task_ids, errors
+
+    publish_errors = await run_in_threadpool(publish_notifications, [
+        (str(task_ids[i]), user.email, entries[i][0].model_dump(),
+         entries[i][1])
+        for i in new
+    ])
+    if publish_errors:
+        failed = [uuid.UUID(key) for key in publish_errors]
+        await session.execute(
+            delete(Reminder).where(Reminder.task_id.in_(failed))
+        )
+        await session.execute(bump_versions_stmt([user.id]))
+        await events.broker.publish(session, user.id, events.FAILED, failed)
+        await session.commit()
+
+    return task_ids, {**errors, **publish_errors}
+
+
 @app.post(
     "/schedule/notification",
     status_code=200,
@@ -225,29 +468,20 @@ async def schedule_notification(
         task: TaskSchema,
         session: AsyncSession = Depends(get_db),
         user: User = Depends(current_verified_user),
+        idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
 
     try:
         notification_time = task.deadline - timedelta(hours=1)
 
-        result = send_notification.apply_async(
-            args=[user.email, task.model_dump()],
-            eta=notification_time
-        )
-
-        reminder = Reminder(
-            plannable_id=task.plannable_id,
-            task_id=result.id,
-            user_id=user.id,
-            course_name=task.course_name,
-            assignment_name=task.assignment_name,
-            deadline=task.deadline
+        task_ids, errors = await schedule_reminders(
+            session, user, [(task, notification_time)], [idempotency_key]
         )
-        session.add(reminder)
-        await session.commit()
+        if errors:
+            raise HTTPException(status_code=400)
 
         return {
-            "task_id": result.id
+            "task_id": task_ids[0]
         }
     except Exception as e:
         raise HTTPException(
@@ -255,6 +489,60 @@ async def schedule_notification(
             detail="Unable to schedule notification"
         )
 
+MAX_BATCH_SIZE = 200
+# Items are stored under "<key>:<index>", which must still fit the
+# String(255) idempotency_key column.
+MAX_BATCH_IDEMPOTENCY_KEY_LENGTH = 255 - len(f":{MAX_BATCH_SIZE - 1}")
+
+
+@app.post(
+    "/schedule/notifications",
+    response_model=List[BatchScheduleResult],
+    status_code=200,
+    description="Schedule notifications for several assignments at once."
+)
+async def schedule_notifications(
+        tasks: List[dict] = Body(..., max_length=MAX_BATCH_SIZE),
+        session: AsyncSession = Depends(get_db),
+        user: User = Depends(current_verified_user),
+        idempotency_key: Optional[str] = Header(
+            None, max_length=MAX_BATCH_IDEMPOTENCY_KEY_LENGTH
+        ),
+):
+    results = []
+    entries = []
+    keys = []
+    for index, item in enumerate(tasks):
+        try:
+            task = TaskSchema.model_validate(item)
+        except ValidationError as e:
+            results.append(BatchScheduleResult(
+                index=index, error=str(e.errors()[0]["msg"])
+            ))
+            continue
+
+        entries.append((task, task.deadline - timedelta(hours=1)))
+        # A batch key covers each item by its position in the batch.
+        keys.append(f"{idempotency_key}:{index}" if idempotency_key else None)
+        results.append(BatchScheduleResult(index=index))
+
+    if not entries:
+        return results
+
+    task_ids, errors = await schedule_reminders(session, user, entries, keys)
+
+    scheduled = iter(task_ids)
+    for result in results:
+        if result.error is not None:
+            continue
+        task_id = next(scheduled)
+        if str(task_id) in errors:
+            result.error = "Unable to schedule notification"
+        else:
+            result.task_id = task_id
+
+    return results
+
 @app.post(
     "/send/fake/notification",
     status_code=200,
@@ -264,27 +552,18 @@ async def schedule_fake_notification(
         task: TaskSchema,
         session: AsyncSession = Depends(get_db),
         user: User = Depends(current_verified_user),
+        idempotency_key: Optional[str] = Header(None, max_length=255),
 ):
 
     try:
-        result = send_notification.apply_async(
-            args=[user.email, task.model_dump()],
-            eta=task.deadline
-        )
-
-        reminder = Reminder(
-            plannable_id=task.plannable_id,
-            task_id=result.id,
-            user_id=user.id,
-            course_name=task.course_name,
-            assignment_name=task.assignment_name,
-            deadline=task.deadline
+        task_ids, errors = await schedule_reminders(
+            session, user, [(task, task.deadline)], [idempotency_key]
         )
-        session.add(reminder)
-        await session.commit()
+        if errors:
+            raise HTTPException(status_code=400)
 
         return {
-            "task_id": result.id
+            "task_id": task_ids[0]
         }
     except Exception as e:
         raise HTTPException(
@@ -1,2 +1,4 @@
 from app.core.database import Base
-from app.models.user import User, get_user_db, CanvasToken, Reminder, ReminderStatus
\ No newline at end of file
+from app.models.user import User, get_user_db, CanvasToken, Reminder, ReminderStatus, \
+    ReminderArchive, UserVersion
+from app.models.assignment import Assignment, SyncCheckpoint
\ No newline at end of file
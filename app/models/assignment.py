@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Integer, DateTime, Boolean, Float, Index, \
+    UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import String, UUID
+
+from app.core.database import Base
+
+
+class Assignment(Base):
+    __tablename__ = "assignments"
+    __table_args__ = (
+        UniqueConstraint("user_id", "plannable_id",
+                         name="uq_assignments_user_id_plannable_id"),
+        Index("ix_assignments_user_id_deadline", "user_id", "deadline"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    plannable_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    course: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    deadline: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    submitted: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    graded: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    points_possible: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True
+    )
+
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("user.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    user: Mapped["User"] = relationship(back_populates="assignments")
+
+
+class SyncCheckpoint(Base):
+    """Progress of one shard of the periodic Canvas sync.
+
+    Users of a shard are synced in ``user_id`` order; ``last_user_id`` is the
+    last one of the last completed batch, so a crashed run resumes after it.
+    Keyed by shard count as well, so resharding starts from scratch.
+    """
+    __tablename__ = "sync_checkpoints"
+
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    shards: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    heartbeat_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_user_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )
+    synced: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,10 +1,11 @@
 import uuid
 import enum
 from datetime import datetime
+from typing import Optional
 
 from fastapi import Depends
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
-from sqlalchemy import ForeignKey, Integer, DateTime
+from sqlalchemy import ForeignKey, Integer, BigInteger, DateTime, Index, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import String, UUID, Enum
@@ -27,6 +28,12 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
         cascade="all, delete-orphan"
     )
 
+    assignments: Mapped[list["Assignment"]] = relationship(
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
 
 class CanvasToken(Base):
     __tablename__ = "canvastoken"
@@ -49,9 +56,45 @@ class CanvasToken(Base):
 class ReminderStatus(enum.Enum):
     finished = "finished"
     pending = "pending"
+    cancelled = "cancelled"
+    failed = "failed"
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Pending reminders of a user, and the "already has a reminder"
+        # lookup by plannable id, are answered from this index alone.
+        Index("ix_reminders_user_id_status_plannable_id",
+              "user_id", "status", "plannable_id"),
+        Index("ix_reminders_task_id", "task_id", unique=True),
+        Index("ix_reminders_deadline", "deadline"),
+        # Serve the dispatcher's claim query: rows due and not yet
+        # dispatched, and rows whose dispatch lease ran out.
+        Index(
+            "ix_reminders_due",
+            "fire_at",
+            postgresql_where=text(
+                "status = 'pending' AND dispatched_at IS NULL"
+            ),
+        ),
+        Index(
+            "ix_reminders_dispatched",
+            "dispatched_at",
+            postgresql_where=text(
+                "status = 'pending' AND dispatched_at IS NOT NULL"
+            ),
+        ),
+        # At most one active reminder per assignment; scheduling inserts
+        # with ON CONFLICT DO NOTHING against this and the index below.
+        Index(
+            "uq_reminders_active_user_id_plannable_id",
+            "user_id", "plannable_id",
+            unique=True,
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index("uq_reminders_user_id_idempotency_key",
+              "user_id", "idempotency_key", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -71,6 +114,21 @@ class Reminder(Base):
     deadline: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False
     )
+    fire_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Failed sends so far; past REMINDER_SEND_MAX_RETRIES the reminder is
+    # marked failed.
+    send_attempts: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Client-supplied ``Idempotency-Key`` the reminder was scheduled with.
+    idempotency_key: Mapped[Optional[str]] = mapped_column(
+        String(length=255), nullable=True
+    )
 
     status: Mapped[ReminderStatus] = mapped_column(
         Enum(ReminderStatus, name="reminder_status"),
@@ -86,6 +144,58 @@ class Reminder(Base):
     user: Mapped["User"] = relationship(back_populates="reminders")
 
 
+class ReminderArchive(Base):
+    """Reminders moved out of ``reminders`` by the retention task."""
+    __tablename__ = "reminders_archive"
+    __table_args__ = (
+        Index("ix_reminders_archive_user_id", "user_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True
+    )
+    plannable_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    task_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), nullable=False
+    )
+    course_name: Mapped[str] = mapped_column(
+        String(length=320), nullable=False
+    )
+    assignment_name: Mapped[str] = mapped_column(
+        String(length=320), nullable=False
+    )
+    deadline: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    fire_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    status: Mapped[ReminderStatus] = mapped_column(
+        Enum(ReminderStatus, name="reminder_status"), nullable=False
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), nullable=False
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+
+class UserVersion(Base):
+    """Bumped whenever the user's reminders or synced assignments change;
+    the listings derive their ETag from it."""
+    __tablename__ = "user_versions"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
 
 async def get_user_db(session: AsyncSession = Depends(get_db)):
     yield SQLAlchemyUserDatabase(session, User)
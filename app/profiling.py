@@ -0,0 +1,139 @@
+"""Per-request SQL accounting and on-demand profiling.
+
+Every request counts the statements it runs through ``sessionmanager``;
+requests over ``PROFILING_QUERY_BUDGET`` statements are logged as likely
+N+1s.
+
+A superuser can send ``X-Profile: 1`` to have that one request profiled and
+its counts returned in ``X-Query-Count`` / ``X-Query-Time-Ms``; other
+clients never see them. The report is kept in memory by the process that served it and can
+be fetched from ``/admin/profiles/{id}`` (id in ``X-Profile-Id``). The
+sampling profiler ``pyinstrument`` is used when installed (``profiling``
+extra); otherwise ``cProfile`` is used, which also sees concurrent requests.
+"""
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request
+from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy import event
+
+from app.core import settings, sessionmanager
+from app.models import User
+from app.users import UserManager, bearer_transport, get_jwt_strategy
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+
+
+query_stats: contextvars.ContextVar[Optional[QueryStats]] = \
+    contextvars.ContextVar("query_stats", default=None)
+
+reports: OrderedDict[str, str] = OrderedDict()
+
+
+def instrument_query_accounting(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context,
+                              executemany):
+        conn.info.setdefault("accounting_start", []).append(
+            time.perf_counter()
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context,
+                             executemany):
+        start = conn.info["accounting_start"].pop()
+        stats = query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.duration += time.perf_counter() - start
+
+
+async def is_superuser(request: Request) -> bool:
+    token = request.cookies.get(bearer_transport.cookie_name)
+    if token is None:
+        return False
+    async with sessionmanager.session() as session:
+        user_manager = UserManager(SQLAlchemyUserDatabase(session, User))
+        user = await get_jwt_strategy().read_token(token, user_manager)
+    return user is not None and user.is_active and user.is_superuser
+
+
+def store_report(report: str) -> str:
+    report_id = uuid.uuid4().hex
+    reports[report_id] = report
+    while len(reports) > settings.PROFILING_MAX_REPORTS:
+        reports.popitem(last=False)
+    return report_id
+
+
+async def profile_call(request: Request, call_next):
+    if Profiler is not None:
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        return response, profiler.output_text(unicode=True)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.disable()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative") \
+        .print_stats(40)
+    return response, output.getvalue()
+
+
+async def profiling_middleware(request: Request, call_next):
+    stats = QueryStats()
+    query_stats.set(stats)
+
+    report = None
+    if request.headers.get("X-Profile") == "1" and \
+            await is_superuser(request):
+        # The superuser lookup itself is not part of the request's budget.
+        stats.count, stats.duration = 0, 0.0
+        response, report = await profile_call(request, call_next)
+    else:
+        response = await call_next(request)
+
+    if stats.count > settings.PROFILING_QUERY_BUDGET:
+        logger.warning(
+            "Possible N+1: %s %s ran %d queries (budget %d) in %.1f ms",
+            request.method, request.url.path, stats.count,
+            settings.PROFILING_QUERY_BUDGET, stats.duration * 1000
+        )
+
+    if report is not None:
+        response.headers["X-Query-Count"] = str(stats.count)
+        response.headers["X-Query-Time-Ms"] = f"{stats.duration * 1000:.1f}"
+        report = (f"{request.method} {request.url.path}\n"
+                  f"queries: {stats.count} "
+                  f"({stats.duration * 1000:.1f} ms)\n\n{report}")
+        response.headers["X-Profile-Id"] = store_report(report)
+
+    return response
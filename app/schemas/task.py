@@ -1,5 +1,6 @@
 import uuid
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel
 
@@ -16,3 +17,9 @@ class ReminderSchema(TaskReminderBase):
 
 class TaskSchema(TaskReminderBase):
     grade: float
+
+
+class BatchScheduleResult(BaseModel):
+    index: int
+    task_id: Optional[uuid.UUID] = None
+    error: Optional[str] = None
@@ -1,63 +1,217 @@
 from app.celery import celery
-import boto3
+from celery.signals import worker_process_shutdown
+from celery.utils.time import get_exponential_backoff_interval
+from celery.worker.control import inspect_command
 
-import smtplib
-from email.message import EmailMessage
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
 
+from app.canvas import CanvasError, sync_shard, sync_user_assignments_once
 from app.core import settings
-from app.core.database import get_sync_db
-from app.models import Reminder
+from app.core.database import get_sync_db, sync_sessionmanager
+from app.core.metrics import mark_process_dead
+from app.events import FAILED, SENT, notify_stmt
+from app.mail import is_throttled, send_email, smtp_pool
+from app.models import Reminder, ReminderStatus, CanvasToken
+from app.versions import bump_versions_stmt
 
-from sqlalchemy import delete
+from sqlalchemy import select, update, and_, text
+from sqlalchemy.exc import SQLAlchemyError
 
 
-def send_email(to_email: str, subject: str, body: str):
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = settings.FROM_EMAIL
-    msg["To"] = to_email
-    msg.set_content(body)
+@inspect_command()
+def pool_stats(state):
+    """``celery -A app.celery.celery inspect pool_stats``"""
+    return sync_sessionmanager.pool_stats()
 
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(settings.FROM_EMAIL, settings.GMAIL_APP_PASSWORD)
-        smtp.send_message(msg)
 
+@worker_process_shutdown.connect
+def close_smtp_pool(**kwargs):
+    smtp_pool.close()
+    mark_process_dead()
 
 
-@celery.task
-def send_notification(email: str, task: dict):
+def reminder_message(task: dict) -> str:
+    return f"Don't forget to upload {task.get('assignment_name')} for {task.get('course_name')}. Deadline is {task.get('deadline')}"
+
+
+def parse_deadline(value) -> datetime:
+    """Celery's JSON serializer hands the published ``datetime`` back as one;
+    messages published as plain JSON carry an ISO string instead."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def digest_message(tasks: list[dict]) -> str:
+    lines = ["Don't forget to upload these assignments:", ""]
+    for task in sorted(tasks, key=lambda t: t["deadline"]):
+        lines.append(f"- {task['assignment_name']} for {task['course_name']}. "
+                     f"Deadline is {task['deadline']}")
+    return "\n".join(lines)
+
+
+def retry_countdown(retries: int) -> int:
+    return get_exponential_backoff_interval(
+        settings.REMINDER_SEND_RETRY_BACKOFF, retries,
+        settings.REMINDER_SEND_MAX_BACKOFF, full_jitter=True
+    )
+
+
+# Send failures are counted on the reminder row (``send_attempts``) rather
+# than by Celery, so they survive being re-dispatched by app.scheduler. The
+# message is only acked once the task is done, so a worker dying mid-send
+# hands it back to the broker.
+@celery.task(bind=True, ignore_result=True, max_retries=None,
+             acks_late=True, reject_on_worker_lost=True)
+def send_notification(self, email: str, task: dict):
 
     with get_sync_db() as session:
-        stmt = delete(Reminder).where(
-            Reminder.plannable_id==task.get('plannable_id')
-        )
-        result = session.execute(stmt)
-        session.commit()
-        print(f"Deleted {result.rowcount} rows")
+        # Claiming the reminder row first makes the task a no-op when the
+        # reminder was already sent as part of another task's digest.
+        try:
+            claimed = session.execute(
+                update(Reminder)
+                .where(
+                    and_(
+                        Reminder.task_id == self.request.id,
+                        Reminder.status == ReminderStatus.pending
+                    )
+                )
+                .values(status=ReminderStatus.finished)
+                .returning(Reminder.user_id, Reminder.fire_at)
+            ).one_or_none()
+        except SQLAlchemyError as e:
+            # Database down or pool exhausted: nothing is claimed, so try
+            # again later instead of dropping the message. app.dispatcher
+            # retries and requeues these itself.
+            session.rollback()
+            if self.request.is_eager:
+                raise
+            raise self.retry(exc=e,
+                             countdown=retry_countdown(self.request.retries))
+        if claimed is None:
+            session.rollback()
+            print(f"Reminder {self.request.id} is no longer pending")
+            return
 
-    # ses = boto3.client('ses', region_name=settings.AWS_REGION)
+        # Every entry's deadline is a datetime, so the digest can sort them.
+        tasks = [{**task, "deadline": parse_deadline(task["deadline"])}]
+        task_ids = [uuid.UUID(self.request.id)]
+        if settings.REMINDER_DIGEST_WINDOW > 0:
+            # Fold every other pending reminder of this user that is due
+            # within the window into the same email. The rows stay locked,
+            # and only become finished, if the email goes out.
+            window_end = claimed.fire_at + timedelta(
+                seconds=settings.REMINDER_DIGEST_WINDOW
+            )
+            # Rows another task is already sending are skipped rather than
+            # waited on, so two overlapping digests can never deadlock.
+            due = (
+                select(Reminder.id)
+                .where(
+                    and_(
+                        Reminder.user_id == claimed.user_id,
+                        Reminder.status == ReminderStatus.pending,
+                        Reminder.fire_at <= window_end
+                    )
+                )
+                .with_for_update(skip_locked=True)
+            )
+            others = session.execute(
+                update(Reminder)
+                .where(Reminder.id.in_(due.scalar_subquery()))
+                .values(status=ReminderStatus.finished)
+                .returning(Reminder.task_id, Reminder.assignment_name,
+                           Reminder.course_name, Reminder.deadline)
+            ).all()
+            task_ids.extend(other.task_id for other in others)
+            tasks.extend(
+                {
+                    "assignment_name": other.assignment_name,
+                    "course_name": other.course_name,
+                    "deadline": other.deadline,
+                }
+                for other in others
+            )
 
-    # response = ses.send_email(
-    #     Source=settings.FROM_EMAIL,
-    #     Destination={'ToAddresses': [f"{email}"]},
-    #     Message={
-    #         'Subject': {'Data': 'Deadline Reminder'},
-    #         'Body': {'Text': {
-    #             'Data': f"Don't forget to upload {task.get('assignment_name')} for "
-    #                     f"{task.get('course_name')}. Deadline is {task.get('deadline')}"}}
-    #     }
-    # )
+        # ses = get_ses_client()
 
-    # print("Email sent:", response['MessageId'])
-    message = f"Don't forget to upload {task.get('assignment_name')} for {task.get('course_name')}. Deadline is {task.get('deadline')}"
+        # response = ses.send_email(
+        #     Source=settings.FROM_EMAIL,
+        #     Destination={'ToAddresses': [f"{email}"]},
+        #     Message={
+        #         'Subject': {'Data': 'Deadline Reminder'},
+        #         'Body': {'Text': {
+        #             'Data': f"Don't forget to upload {task.get('assignment_name')} for "
+        #                     f"{task.get('course_name')}. Deadline is {task.get('deadline')}"}}
+        #     }
+        # )
 
-    send_email(email, "Reminder", message)
+        # print("Email sent:", response['MessageId'])
+        try:
+            if len(tasks) == 1:
+                send_email(email, "Reminder", reminder_message(task))
+            else:
+                send_email(email, "Reminders", digest_message(tasks))
+        except Exception as e:
+            # Nothing went out, so every row is pending again; reminders
+            # folded in from other tasks are left to those tasks.
+            session.rollback()
+            if self.request.is_eager and is_throttled(e):
+                # app.dispatcher backs off and requeues throttled sends.
+                raise
 
+            reminder = update(Reminder).where(
+                and_(
+                    Reminder.task_id == self.request.id,
+                    Reminder.status == ReminderStatus.pending
+                )
+            )
+            attempts = session.execute(
+                reminder.values(send_attempts=Reminder.send_attempts + 1)
+                .returning(Reminder.send_attempts)
+            ).scalar_one_or_none()
+            if attempts is None:
+                # Sent or cancelled in the meantime.
+                session.rollback()
+                raise
 
-@celery.task
+            if attempts > settings.REMINDER_SEND_MAX_RETRIES:
+                session.execute(reminder.values(status=ReminderStatus.failed))
+                session.execute(
+                    notify_stmt(claimed.user_id, FAILED, task_ids[:1])
+                )
+                session.execute(bump_versions_stmt([claimed.user_id]))
+                session.commit()
+                raise
+
+            countdown = retry_countdown(attempts - 1)
+            if settings.REMINDER_SCHEDULER == "database":
+                # app.scheduler claims the row again once it is due.
+                session.execute(reminder.values(
+                    dispatched_at=None,
+                    fire_at=datetime.now(timezone.utc)
+                    + timedelta(seconds=countdown)
+                ))
+                session.commit()
+                print(f"Reminder {self.request.id} failed ({e!r}), "
+                      f"retrying in {countdown}s")
+                return
+            session.commit()
+            raise self.retry(exc=e, countdown=countdown)
+
+        session.execute(notify_stmt(claimed.user_id, SENT, task_ids))
+        session.execute(bump_versions_stmt([claimed.user_id]))
+        session.commit()
+        print(f"Sent {len(tasks)} reminders to {email}")
+
+
+@celery.task(ignore_result=True)
 def send_verification_email(email: str, token: str):
 
-    # ses = boto3.client('ses', region_name=settings.AWS_REGION)
+    # ses = get_ses_client()
     # response = ses.send_email(
     #     Source=settings.FROM_EMAIL,
     #     Destination={'ToAddresses': [f"{email}"]},
@@ -72,10 +226,10 @@ def send_verification_email(email: str, token: str):
 
     send_email(email, "Verification", message)
 
-@celery.task
+@celery.task(ignore_result=True)
 def send_password_reset_email(email: str, token: str):
 
-    # ses = boto3.client('ses', region_name=settings.AWS_REGION)
+    # ses = get_ses_client()
     # response = ses.send_email(
     #     Source=settings.FROM_EMAIL,
     #     Destination={'ToAddresses': [f"{email}"]},
@@ -87,4 +241,107 @@ def send_password_reset_email(email: str, token: str):
     # )
 
     message = f"Password Reset URL: {settings.FRONT_URL}/reset-password?token={token}"
-    send_email(email, "Password Reset", message)
\ No newline at end of file
+    send_email(email, "Password Reset", message)
+
+
+ARCHIVE_REMINDERS = text("""
+    WITH moved AS (
+        DELETE FROM reminders
+        WHERE id IN (
+            SELECT id FROM reminders
+            WHERE (status <> 'pending' AND deadline < :now)
+               OR deadline < :cutoff
+            ORDER BY deadline
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, plannable_id, task_id, course_name, assignment_name,
+                  deadline, fire_at, dispatched_at, status, user_id
+    ), bumped AS (
+        -- Only pending reminders are listed, so only the versions of
+        -- their owners move.
+        INSERT INTO user_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM moved WHERE status = 'pending'
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = user_versions.version + 1
+    )
+    INSERT INTO reminders_archive (
+        id, plannable_id, task_id, course_name, assignment_name,
+        deadline, fire_at, dispatched_at, status, user_id, archived_at
+    )
+    SELECT id, plannable_id, task_id, course_name, assignment_name,
+           deadline, fire_at, dispatched_at, status, user_id, :now
+    FROM moved
+""")
+
+
+@celery.task
+def archive_reminders():
+    """Move finished reminders whose deadline has passed, and any reminder
+    older than the retention window, into ``reminders_archive``.
+
+    Each batch is its own short transaction so the live table is never
+    locked for long; a run stops after ``REMINDER_ARCHIVE_MAX_BATCHES``.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=settings.REMINDER_RETENTION_DAYS)
+    batch_size = settings.REMINDER_ARCHIVE_BATCH_SIZE
+
+    total = 0
+    with get_sync_db() as session:
+        for _ in range(settings.REMINDER_ARCHIVE_MAX_BATCHES):
+            result = session.execute(ARCHIVE_REMINDERS, {
+                "now": now,
+                "cutoff": cutoff,
+                "batch_size": batch_size,
+            })
+            session.commit()
+            total += result.rowcount
+            if result.rowcount < batch_size:
+                break
+
+    print(f"Archived {total} reminders")
+
+
+@celery.task
+def sync_all_assignments():
+    shards = settings.CANVAS_SYNC_SHARDS
+    for shard in range(shards):
+        sync_assignment_shard.delay(shard, shards)
+
+
+@celery.task
+def sync_assignment_shard(shard: int, shards: int):
+    stats = asyncio.run(sync_shard(shard, shards))
+    if stats is None:
+        print(f"Canvas sync shard {shard}/{shards} is already running")
+        return
+    print(f"Canvas sync shard {shard}/{shards}: synced {stats['synced']}, "
+          f"failed {stats['failed']}")
+
+
+@celery.task
+def sync_assignments(user_id: str):
+    user_id = uuid.UUID(user_id)
+
+    with get_sync_db() as session:
+        token = session.scalar(
+            select(CanvasToken.token).where(CanvasToken.user_id == user_id)
+        )
+        if token is None:
+            return
+
+        async def execute(stmt):
+            return session.execute(stmt)
+
+        try:
+            count = asyncio.run(
+                sync_user_assignments_once(execute, user_id, token)
+            )
+        except CanvasError as e:
+            session.rollback()
+            print(f"Canvas sync for {user_id} failed: {e.status_code} {e.detail}")
+            return
+
+        session.commit()
+        print(f"Synced {count} assignments for {user_id}")
@@ -1,22 +1,74 @@
+import time
 import uuid
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Optional
+
+import jwt
 
 from fastapi import Depends, Request, HTTPException
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, models
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, models, \
+    exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy, CookieTransport,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users.jwt import decode_jwt
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.models import User, get_user_db
-from app.tasks import send_verification_email, send_password_reset_email
+from app.celery import celery
 from app.core import settings
 
 SECRET = settings.SECRET
 
 
+class UserCache:
+    """Bounded LRU of authenticated users' column values, keyed by user id.
+
+    Entries are plain data; each hit builds a fresh detached ``User`` so no
+    instance is ever shared between requests or sessions. The cache is per
+    process: ``UserManager`` hooks invalidate it locally and ``ttl`` bounds
+    how long another worker may serve a stale copy.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._data: OrderedDict[uuid.UUID, tuple[float, dict[str, Any]]] = \
+            OrderedDict()
+        self._columns = [column.key for column in User.__table__.columns]
+
+    def get(self, user_id: uuid.UUID) -> Optional[User]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at <= time.monotonic():
+            del self._data[user_id]
+            return None
+        self._data.move_to_end(user_id)
+
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def set(self, user: User):
+        values = {key: getattr(user, key) for key in self._columns}
+        self._data[user.id] = (time.monotonic() + self._ttl, values)
+        self._data.move_to_end(user.id)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: uuid.UUID):
+        self._data.pop(user_id, None)
+
+
+user_cache = UserCache(settings.USER_CACHE_MAX_ENTRIES,
+                       settings.USER_CACHE_TTL)
+
+
 class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
@@ -24,16 +76,39 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     async def on_after_register(self, user: User, request: Optional[Request] = None):
         print(f"User {user.id} has registered.")
 
+    async def on_after_update(
+        self, user: User, update_dict: dict[str, Any],
+        request: Optional[Request] = None
+    ):
+        user_cache.invalidate(user.id)
+
+    async def on_after_verify(
+        self, user: User, request: Optional[Request] = None
+    ):
+        user_cache.invalidate(user.id)
+
+    async def on_after_reset_password(
+        self, user: User, request: Optional[Request] = None
+    ):
+        user_cache.invalidate(user.id)
+
+    async def on_after_delete(
+        self, user: User, request: Optional[Request] = None
+    ):
+        user_cache.invalidate(user.id)
+
     async def on_after_forgot_password(
         self, user: User, token: str, request: Optional[Request] = None
     ):
         print(f"User {user.id} has forgot their password. Reset token: {token}")
-        send_password_reset_email.delay(user.email, token)
+        celery.send_task("app.tasks.send_password_reset_email",
+                         args=[user.email, token])
 
     async def on_after_request_verify(
         self, user: User, token: str, request: Optional[Request] = None
     ):
-        send_verification_email.delay(user.email, token)
+        celery.send_task("app.tasks.send_verification_email",
+                         args=[user.email, token])
 
 
 async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db)):
@@ -43,8 +118,42 @@ async def get_user_manager(user_db: SQLAlchemyUserDatabase = Depends(get_user_db
 bearer_transport = CookieTransport(cookie_max_age=3600)
 
 
-def get_jwt_strategy() -> JWTStrategy[models.UP, models.ID]:
-    return JWTStrategy(secret=SECRET, lifetime_seconds=3600)
+class CachedJWTStrategy(JWTStrategy[models.UP, models.ID]):
+    """JWT strategy that resolves the token's user through ``user_cache``
+    before falling back to the database."""
+
+    def read_user_id(self, token: Optional[str]) -> Optional[uuid.UUID]:
+        """The user id of a valid ``token``, without loading the user."""
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience,
+                              algorithms=[self.algorithm])
+            return uuid.UUID(data["sub"])
+        except (jwt.PyJWTError, KeyError, ValueError, TypeError):
+            return None
+
+    async def read_token(
+        self, token: Optional[str],
+        user_manager: BaseUserManager[models.UP, models.ID]
+    ) -> Optional[models.UP]:
+        user_id = self.read_user_id(token)
+        if user_id is None:
+            return None
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await user_manager.get(user_id)
+            except exceptions.UserNotExists:
+                return None
+            user_cache.set(user)
+        return user
+
+
+def get_jwt_strategy() -> CachedJWTStrategy[models.UP, models.ID]:
+    return CachedJWTStrategy(secret=SECRET, lifetime_seconds=3600)
 
 
 auth_backend = AuthenticationBackend(
@@ -57,4 +166,5 @@ fastapi_users = FastAPIUsers[User, uuid.UUID](get_user_manager, [auth_backend])
 
 current_active_user = fastapi_users.current_user(active=True)
 current_verified_user = fastapi_users.current_user(active=True,
-                                                   verified=True)
\ No newline at end of file
+                                                   verified=True)
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
@@ -0,0 +1,57 @@
+"""Per-user data versions behind the listings' ETags.
+
+Every write to a user's reminders or synced assignments runs
+``bump_versions_stmt`` in the same transaction, so a listing whose ETag
+still matches the stored version can be answered with 304 without being
+queried again.
+"""
+import uuid
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import UserVersion
+
+
+def bump_versions_stmt(user_ids: Iterable[uuid.UUID]):
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return None
+    stmt = insert(UserVersion).values(
+        [{"user_id": user_id, "version": 1} for user_id in user_ids]
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[UserVersion.user_id],
+        set_={"version": UserVersion.version + 1},
+    )
+
+
+async def get_version(session: AsyncSession, user_id: uuid.UUID) -> int:
+    version = await session.scalar(
+        select(UserVersion.version).where(UserVersion.user_id == user_id)
+    )
+    return version or 0
+
+
+def make_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 for ``etag`` if the request's ``If-None-Match`` matches it
+    (weak comparison), else ``None``."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    # Private and always revalidated: the body depends on the cookie's user.
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
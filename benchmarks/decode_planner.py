@@ -0,0 +1,60 @@
+"""Microbenchmark for decoding a planner page into assignment records.
+
+Compares the original ``response.json()``-style path (stdlib json plus dict
+picking), orjson plus dict picking, and the typed msgspec decoder (when
+installed) on one large planner payload::
+
+    python -m benchmarks.decode_planner --items 500 --payload-bytes 4096
+    python -m benchmarks.decode_planner --payload recorded_planner.json
+
+``--payload`` takes a recorded ``/api/v1/planner/items`` response body; by
+default a synthetic one is generated with the fake Canvas server's items.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timezone
+
+import orjson
+
+from app.canvas import decoding
+from benchmarks.fake_canvas import planner_items
+
+
+def load_payload(args) -> bytes:
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            return f.read()
+    items = planner_items("benchmark", 0, args.items,
+                          datetime.now(timezone.utc), args.payload_bytes)
+    return orjson.dumps(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", help="Recorded planner response body.")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--payload-bytes", type=int, default=4096)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    content = load_payload(args)
+    decoders = {
+        "json + dicts": lambda: decoding.to_assignments(json.loads(content)),
+        "orjson + dicts": lambda: decoding.decode_assignments_orjson(content),
+    }
+    if decoding.msgspec is not None:
+        decoders["msgspec structs"] = \
+            lambda: decoding.decode_assignments_typed(content)
+
+    expected = decoders["json + dicts"]()
+    print(f"payload: {len(content) / 1024:.0f} KiB, "
+          f"{len(expected)} assignments")
+    for name, decode in decoders.items():
+        assert decode() == expected, name
+        best = min(timeit.repeat(decode, number=args.number, repeat=5))
+        print(f"{name:<18}{best / args.number * 1000:>9.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
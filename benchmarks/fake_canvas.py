@@ -0,0 +1,163 @@
+"""Local stand-in for the Canvas planner API.
+
+Serves ``GET /api/v1/planner/items`` with Canvas-style ``Link`` pagination and
+ETags, plus configurable latency, page counts, payload sizes and injected
+401/429 responses, so the app can be load-tested without touching the real
+Canvas::
+
+    python -m benchmarks.fake_canvas --port 9000 --pages 4 --latency-ms 150
+
+and run the API with ``CANVAS_BASE_URL=http://localhost:9000``. Tokens that
+start with ``invalid`` always get a 401.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from fastapi import FastAPI, Header, Request
+from fastapi.responses import ORJSONResponse, Response
+
+
+@dataclass
+class FakeCanvasConfig:
+    latency_ms: float = 100.0
+    jitter_ms: float = 20.0
+    pages: int = 3
+    per_page: int = 50
+    payload_bytes: int = 1024
+    error_401_rate: float = 0.0
+    error_429_rate: float = 0.0
+    rate_limit: float = 700.0
+
+
+def planner_items(token: str, page: int, per_page: int, start: datetime,
+                  payload_bytes: int) -> list[dict]:
+    seed = int(hashlib.sha256(token.encode()).hexdigest()[:6], 16)
+    filler = "x" * payload_bytes
+    items = []
+    for index in range(per_page):
+        number = page * per_page + index
+        # reminders.plannable_id is a 32-bit integer.
+        plannable_id = seed % 100_000 * 10_000 + number
+        due_at = start + timedelta(hours=2 + number)
+        items.append({
+            "context_type": "Course",
+            "course_id": 1000 + number % 5,
+            "plannable_id": plannable_id,
+            "plannable_type": "assignment" if number % 4 else "quiz",
+            "context_name": f"Course {number % 5}",
+            "html_url": f"/courses/{1000 + number % 5}/assignments/{plannable_id}",
+            "new_activity": False,
+            "submissions": {
+                "submitted": number % 3 == 0,
+                "excused": False,
+                "graded": number % 6 == 0,
+                "late": False,
+                "missing": False,
+                "needs_grading": False,
+                "has_feedback": False,
+            },
+            "plannable": {
+                "id": plannable_id,
+                "title": f"Assignment {number}",
+                "due_at": due_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "points_possible": float(10 + number % 90),
+                "description": filler,
+                "created_at": "2025-01-01T00:00:00Z",
+                "updated_at": "2025-01-01T00:00:00Z",
+            },
+        })
+    return items
+
+
+def create_app(config: FakeCanvasConfig) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/planner/items")
+    async def get_planner_items(
+            request: Request,
+            start_date: str,
+            end_date: str,
+            per_page: int = 10,
+            page: int = 0,
+            authorization: str = Header(""),
+            if_none_match: str | None = Header(None),
+    ):
+        delay = config.latency_ms + random.uniform(-config.jitter_ms,
+                                                   config.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+
+        token = authorization.removeprefix("Bearer ")
+        if token.startswith("invalid") or \
+                random.random() < config.error_401_rate:
+            return ORJSONResponse(
+                {"errors": [{"message": "Invalid access token."}]},
+                status_code=401
+            )
+        if random.random() < config.error_429_rate:
+            return ORJSONResponse(
+                {"message": "Rate Limit Exceeded"},
+                status_code=429,
+                headers={"X-Rate-Limit-Remaining": "0",
+                         "X-Request-Cost": "1"}
+            )
+
+        rate_headers = {
+            "X-Rate-Limit-Remaining": str(config.rate_limit),
+            "X-Request-Cost": "1",
+        }
+        etag = '"' + hashlib.sha256(
+            f"{token}:{page}:{per_page}:{start_date}".encode()
+        ).hexdigest()[:32] + '"'
+        if if_none_match == etag:
+            return Response(status_code=304,
+                            headers={"ETag": etag, **rate_headers})
+
+        start = datetime.fromisoformat(start_date)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        per_page = min(per_page, config.per_page)
+        items = planner_items(token, page, per_page, start,
+                              config.payload_bytes)
+
+        headers = {"ETag": etag, **rate_headers}
+        if page + 1 < config.pages:
+            next_url = request.url.include_query_params(page=page + 1)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return ORJSONResponse(items, headers=headers)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--error-401-rate", type=float, default=0.0)
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeCanvasConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        pages=args.pages,
+        per_page=args.per_page,
+        payload_bytes=args.payload_bytes,
+        error_401_rate=args.error_401_rate,
+        error_429_rate=args.error_429_rate,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
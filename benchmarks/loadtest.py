@@ -0,0 +1,179 @@
+"""Drive the real API at a target concurrency and report latency percentiles.
+
+Each virtual user registers (or reuses) an account, is marked verified
+directly in the database, logs in, saves a Canvas token and then loops over
+the reminder flow until the duration is up::
+
+    python -m benchmarks.loadtest --api-url http://localhost:8080 \\
+        --concurrency 50 --duration 60
+
+Point the API at ``benchmarks.fake_canvas`` via ``CANVAS_BASE_URL`` first.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+from sqlalchemy import update
+
+PASSWORD = "loadtest-password"
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    async def timed(self, name: str, request) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def verify_users(emails: list[str]):
+    # Verification normally goes through an emailed token; for a load test
+    # the accounts are flipped directly.
+    from app.core.database import get_sync_db
+    from app.models import User
+
+    with get_sync_db() as session:
+        session.execute(
+            update(User).where(User.email.in_(emails)).values(is_verified=True)
+        )
+        session.commit()
+
+
+async def register(client: httpx.AsyncClient, email: str):
+    response = await client.post("/auth/register", json={
+        "email": email,
+        "password": PASSWORD,
+        "username": email.split("@")[0],
+    })
+    # 400 means the account exists from an earlier run.
+    if response.status_code not in (201, 400):
+        response.raise_for_status()
+
+
+async def login(client: httpx.AsyncClient, email: str, canvas_token: str):
+    response = await client.post("/auth/jwt/login", data={
+        "username": email,
+        "password": PASSWORD,
+    })
+    response.raise_for_status()
+    response = await client.post("/save/token",
+                                 params={"token": canvas_token})
+    response.raise_for_status()
+
+
+async def virtual_user(client: httpx.AsyncClient, stats: Stats,
+                       deadline: float):
+    refresh = True
+    while time.perf_counter() < deadline:
+        response = await stats.timed("upcoming_assignments", client.get(
+            "/upcoming/assignments", params={"refresh": refresh}
+        ))
+        refresh = False
+        assignments = response.json() if response is not None and \
+            response.status_code == 200 else []
+        if not assignments:
+            await stats.timed("active_reminders",
+                              client.get("/active/reminders"))
+            continue
+
+        assignment = random.choice(assignments)
+        response = await stats.timed("schedule_notification", client.post(
+            "/schedule/notification", json={
+                "plannable_id": assignment["plannable_id"],
+                "course_name": assignment["course"] or "",
+                "assignment_name": assignment["name"] or "",
+                "deadline": assignment["deadline"],
+                "grade": assignment["points_possible"] or 0,
+            }
+        ))
+        await stats.timed("active_reminders", client.get("/active/reminders"))
+
+        if response is not None and response.status_code == 200:
+            await stats.timed("delete_reminder", client.delete(
+                "/delete/reminder",
+                params={"task_id": response.json()["task_id"]}
+            ))
+
+
+async def run(args) -> tuple[Stats, float]:
+    emails = [f"loadtest-{index}@example.com"
+              for index in range(args.concurrency)]
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    clients = [httpx.AsyncClient(base_url=args.api_url, limits=limits,
+                                 timeout=args.timeout)
+               for _ in emails]
+    try:
+        await asyncio.gather(*(register(client, email)
+                               for client, email in zip(clients, emails)))
+        verify_users(emails)
+        await asyncio.gather(*(
+            login(client, email, f"{args.canvas_token}-{index}")
+            for index, (client, email) in enumerate(zip(clients, emails))
+        ))
+
+        stats = Stats()
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(virtual_user(client, stats, deadline)
+                               for client in clients))
+        return stats, time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def report(stats: Stats, elapsed: float):
+    print(f"{'operation':<24}{'count':>8}{'errors':>8}{'req/s':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    total = 0
+    for name in sorted(set(stats.latencies) | set(stats.errors)):
+        values = stats.latencies[name]
+        total += len(values)
+        print(f"{name:<24}{len(values):>8}{stats.errors[name]:>8}"
+              f"{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 0.50) * 1000:>9.1f}"
+              f"{percentile(values, 0.95) * 1000:>9.1f}"
+              f"{percentile(values, 0.99) * 1000:>9.1f}")
+    print(f"\n{total} requests in {elapsed:.1f}s "
+          f"({total / elapsed:.1f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-url", default="http://localhost:8080")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--canvas-token", default="loadtest",
+                        help="Prefix for the per-user Canvas tokens.")
+    args = parser.parse_args()
+
+    stats, elapsed = asyncio.run(run(args))
+    report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    main()
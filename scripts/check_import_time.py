@@ -0,0 +1,75 @@
+"""Fail when the cold-start import cost of a process entry point regresses.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+checks the cumulative import time against a budget, and that modules the
+process should never load (e.g. boto3 in the API) stay out::
+
+    python scripts/check_import_time.py app.main --budget-ms 1500 \\
+        --forbid boto3 --forbid botocore --forbid psycopg2
+
+Exits non-zero on a violation, so it can gate CI. Run it where the app's
+settings resolve (e.g. with .env present), since importing app.main reads them.
+"""
+import argparse
+import subprocess
+import sys
+
+
+def measure(module: str) -> dict[str, int]:
+    """Return the cumulative import time in microseconds of every module
+    loaded while importing ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"importing {module} failed:\n{result.stderr}")
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--forbid", action="append", default=[],
+                        help="Top-level package that must not be imported.")
+    args = parser.parse_args()
+
+    # Best of three, so one slow run on a busy machine doesn't fail the check.
+    runs = [measure(args.module) for _ in range(3)]
+    total_ms = min(run.get(args.module, 0) for run in runs) / 1000
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.0f} ms "
+                        f"(budget {args.budget_ms:.0f} ms)")
+    loaded = set(runs[0])
+    for package in args.forbid:
+        offenders = sorted(name for name in loaded
+                           if name == package
+                           or name.startswith(package + "."))
+        if offenders:
+            failures.append(f"{args.module} imports {package} "
+                            f"({len(offenders)} modules)")
+
+    slowest = sorted(runs[0].items(), key=lambda item: item[1],
+                     reverse=True)[:15]
+    print(f"import {args.module}: {total_ms:.0f} ms "
+          f"(budget {args.budget_ms:.0f} ms)")
+    for name, cumulative_us in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if failures:
+        print("\n".join(["", "FAILED:"] + failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@
 # Exit immediately if any command fails
 set -e
 
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    # Metric samples are named by PID; never carry them over a restart.
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    rm -f "$PROMETHEUS_MULTIPROC_DIR"/*.db
+fi
+
 echo "Running Alembic migrations..."
 alembic upgrade head
 
@@ -0,0 +1,18 @@
+import os
+
+# app.core.settings validates on import; point it at throwaway values so
+# the modules can be imported without a .env or running services.
+for name, value in {
+    "SECRET": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_NAME": "test",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_BACKEND_URL": "cache+memory://",
+    "FRONT_URL": "http://localhost",
+    "FROM_EMAIL": "test@example.com",
+    "GMAIL_APP_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import orjson
+
+from app.canvas.cache import LocalTier, MemoryStore, PlannerCache, SharedTier
+from app.canvas.planner import PLANNER_ITEMS_PATH, iter_assignment_pages
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_local_tier_expires_entries():
+    tier = LocalTier(max_entries=10, max_bytes=1024)
+    run(tier.set("live", b"1", ttl=60))
+    run(tier.set("expired", b"2", ttl=0))
+
+    assert run(tier.get("live")) == b"1"
+    assert run(tier.get("expired")) is None
+
+
+def test_local_tier_evicts_least_recently_used_entry():
+    tier = LocalTier(max_entries=2, max_bytes=1024)
+    run(tier.set("a", b"1", ttl=60))
+    run(tier.set("b", b"2", ttl=60))
+    run(tier.get("a"))
+    run(tier.set("c", b"3", ttl=60))
+
+    assert run(tier.get("b")) is None
+    assert run(tier.get("a")) == b"1"
+    assert run(tier.get("c")) == b"3"
+
+
+def test_local_tier_evicts_by_bytes():
+    tier = LocalTier(max_entries=10, max_bytes=10)
+    run(tier.set("a", b"x" * 6, ttl=60))
+    run(tier.set("b", b"y" * 6, ttl=60))
+    # Larger than the whole tier: never stored.
+    run(tier.set("c", b"z" * 11, ttl=60))
+
+    assert run(tier.get("a")) is None
+    assert run(tier.get("b")) == b"y" * 6
+    assert run(tier.get("c")) is None
+
+
+def test_shared_hit_is_promoted_to_local_tier():
+    local = LocalTier(max_entries=10, max_bytes=1024)
+    shared = SharedTier(MemoryStore())
+    entry = {"stored_at": 0, "pages": []}
+    run(shared.set("key", orjson.dumps(entry), ttl=60))
+    cache = PlannerCache(local, shared)
+
+    assert run(local.get("key")) is None
+    assert run(cache.get("key")) == entry
+    assert orjson.loads(run(local.get("key"))) == entry
+
+
+PAGE = orjson.dumps([{
+    "plannable_type": "assignment",
+    "plannable_id": 1,
+    "context_name": "CS 250",
+    "plannable": {"title": "Essay", "due_at": "2025-05-01T12:00:00Z"},
+}])
+
+
+def fetch_pages(transport, cache, force=False) -> list[list[dict]]:
+    start = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+    async def pages():
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="https://canvas.test") as client:
+            return [page async for page in iter_assignment_pages(
+                client, "token", start, start + timedelta(days=14),
+                cache, "key", force
+            )]
+
+    return run(pages())
+
+
+def test_stale_page_is_reused_on_304():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=PAGE, headers={"ETag": '"v1"'})
+
+    transport = httpx.MockTransport(handler)
+    # fresh_ttl=0 makes every stored entry stale, so it is revalidated.
+    cache = PlannerCache(LocalTier(max_entries=10, max_bytes=1 << 20),
+                         fresh_ttl=0)
+
+    first = fetch_pages(transport, cache)
+    second = fetch_pages(transport, cache)
+
+    assert [request.url.path for request in requests] == \
+        [PLANNER_ITEMS_PATH] * 2
+    assert [request.headers.get("If-None-Match") for request in requests] == \
+        [None, '"v1"']
+    assert second == first
+    assert second[0][0]["name"] == "Essay"
+
+
+def test_force_revalidates_fresh_entry():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=PAGE, headers={"ETag": '"v1"'})
+
+    transport = httpx.MockTransport(handler)
+    cache = PlannerCache(LocalTier(max_entries=10, max_bytes=1 << 20),
+                         fresh_ttl=60)
+
+    first = fetch_pages(transport, cache)
+    assert fetch_pages(transport, cache) == first
+    assert len(requests) == 1
+
+    assert fetch_pages(transport, cache, force=True) == first
+    assert [request.headers.get("If-None-Match") for request in requests] == \
+        [None, '"v1"']
@@ -0,0 +1,35 @@
+import pytest
+
+from app.canvas.decoding import (
+    DECODE_ERRORS, decode_assignments_orjson, decode_assignments_typed, msgspec,
+)
+
+DECODERS = [decode_assignments_orjson]
+if msgspec is not None:
+    DECODERS.append(decode_assignments_typed)
+
+
+@pytest.mark.parametrize("decode", DECODERS)
+def test_items_without_plannable_type_are_skipped(decode):
+    page = b"""[
+        {"plannable_id": 1, "context_name": "CS 101"},
+        {"plannable_type": "assignment", "plannable_id": 2,
+         "context_name": "CS 250", "submissions": false,
+         "plannable": {"title": "Essay", "due_at": "2025-05-01T12:00:00Z"}}
+    ]"""
+    assert decode(page) == [{
+        "plannable_id": 2,
+        "name": "Essay",
+        "deadline": "2025-05-01T12:00:00Z",
+        "course": "CS 250",
+        "submitted": None,
+        "graded": None,
+        "points_possible": None,
+    }]
+
+
+@pytest.mark.parametrize("decode", DECODERS)
+@pytest.mark.parametrize("content", [b"not json", b'{"errors": []}'])
+def test_malformed_pages_raise_decode_errors(decode, content):
+    with pytest.raises(DECODE_ERRORS):
+        decode(content)
@@ -0,0 +1,56 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import events
+from app.core import settings
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_EVENTS_BACKEND", "memory")
+    broker = events.EventBroker()
+    monkeypatch.setattr(events, "broker", broker)
+    return broker
+
+
+@pytest.fixture
+def session():
+    # The hooks only look at Session.info, so any database will do.
+    with Session(create_engine("sqlite://")) as session:
+        session.execute(text("SELECT 1"))
+        yield session
+
+
+def publish(broker, session, user_id, task_id):
+    asyncio.run(broker.publish(session, user_id, events.SCHEDULED, [task_id]))
+
+
+def test_memory_events_are_delivered_on_commit(broker, session):
+    user_id, task_id = uuid.uuid4(), uuid.uuid4()
+    queue = broker.subscribe(user_id)
+
+    publish(broker, session, user_id, task_id)
+    assert queue.empty()
+
+    session.commit()
+    assert queue.get_nowait() == {
+        "user_id": str(user_id),
+        "event": events.SCHEDULED,
+        "task_ids": [str(task_id)],
+    }
+
+
+def test_memory_events_are_dropped_on_rollback(broker, session):
+    user_id = uuid.uuid4()
+    queue = broker.subscribe(user_id)
+
+    publish(broker, session, user_id, uuid.uuid4())
+    session.rollback()
+    session.execute(text("SELECT 1"))
+    session.commit()
+
+    assert queue.empty()
@@ -0,0 +1,37 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+spec = importlib.util.spec_from_file_location(
+    "check_import_time", ROOT / "scripts" / "check_import_time.py"
+)
+check_import_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(check_import_time)
+
+BUDGET_MS = 1500
+# The API must not pay for the worker's dependencies.
+FORBIDDEN = ["boto3", "botocore", "psycopg2", "app.tasks"]
+
+
+@pytest.fixture(scope="module")
+def runs():
+    # Best of five (the script takes three): the suite runs on shared CI
+    # hosts, where one or two slow runs are common.
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(ROOT)
+        return [check_import_time.measure("app.main") for _ in range(5)]
+
+
+def test_api_import_time_within_budget(runs):
+    total_ms = min(run["app.main"] for run in runs) / 1000
+    assert total_ms <= BUDGET_MS
+
+
+@pytest.mark.parametrize("package", FORBIDDEN)
+def test_api_does_not_import(runs, package):
+    loaded = set(runs[0])
+    assert not [name for name in loaded
+                if name == package or name.startswith(package + ".")]
@@ -0,0 +1,133 @@
+import socket
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from app.mail import SMTPPool
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib to deliver a message."""
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections.append(self.connection)
+        self.wfile.write(b"220 sink ready\r\n")
+        for line in self.rfile:
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO") or command.startswith("HELO"):
+                self.wfile.write(b"250 sink\r\n")
+            elif command == "DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                with sink.lock:
+                    sink.messages += 1
+                self.wfile.write(b"250 queued\r\n")
+            elif command == "NOOP":
+                with sink.lock:
+                    sink.noops += 1
+                self.wfile.write(b"250 ok\r\n")
+            elif command == "QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.lock = threading.Lock()
+        self.connections: list[socket.socket] = []
+        self.messages = 0
+        self.noops = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def drop_connections(self):
+        """Close every client connection, as a server timing out would."""
+        with self.lock:
+            for conn in self.connections:
+                conn.shutdown(socket.SHUT_RDWR)
+
+
+@pytest.fixture
+def sink():
+    server = SMTPSink()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(sink, **kwargs) -> SMTPPool:
+    return SMTPPool("127.0.0.1", sink.port, use_ssl=False, **kwargs)
+
+
+def message() -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = "Reminder"
+    msg["From"] = "from@example.com"
+    msg["To"] = "to@example.com"
+    msg.set_content("Don't forget.")
+    return msg
+
+
+def test_connection_is_reused(sink):
+    pool = make_pool(sink, size=1)
+    for _ in range(3):
+        pool.send(message())
+    pool.close()
+
+    assert sink.messages == 3
+    assert len(sink.connections) == 1
+
+
+def test_connection_is_retired_after_max_messages(sink):
+    pool = make_pool(sink, size=1, max_messages=2)
+    for _ in range(5):
+        pool.send(message())
+    pool.close()
+
+    assert sink.messages == 5
+    assert len(sink.connections) == 3
+
+
+def test_idle_connection_is_checked_with_noop(sink):
+    pool = make_pool(sink, size=1, keepalive_interval=0.05)
+    pool.send(message())
+    pool.send(message())
+    assert sink.noops == 0
+
+    time.sleep(0.1)
+    pool.send(message())
+    pool.close()
+
+    assert sink.noops == 1
+    assert len(sink.connections) == 1
+
+
+def test_reconnects_after_server_drops_connection(sink):
+    # A long keepalive interval skips the NOOP, so the dropped connection
+    # is only noticed by the send itself.
+    pool = make_pool(sink, size=1, keepalive_interval=60)
+    pool.send(message())
+    sink.drop_connections()
+
+    pool.send(message())
+    pool.close()
+
+    assert sink.messages == 2
+    assert len(sink.connections) == 2
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from app.main import MAX_BATCH_IDEMPOTENCY_KEY_LENGTH, app
+from app.models import Reminder
+from app.users import current_verified_user
+
+
+def test_batch_idempotency_key_leaves_room_for_item_index():
+    column_length = Reminder.__table__.c.idempotency_key.type.length
+    assert len("k" * MAX_BATCH_IDEMPOTENCY_KEY_LENGTH + ":199") <= \
+        column_length
+
+
+def test_batch_rejects_key_too_long_for_item_keys():
+    app.dependency_overrides[current_verified_user] = lambda: None
+    try:
+        response = TestClient(app).post(
+            "/schedule/notifications",
+            json=[],
+            headers={
+                "Idempotency-Key": "k" * (MAX_BATCH_IDEMPOTENCY_KEY_LENGTH + 1)
+            },
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 422
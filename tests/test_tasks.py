@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone
+
+from kombu.utils.json import dumps, loads
+
+from app.tasks import digest_message, parse_deadline
+
+
+def test_digest_mixes_published_and_folded_reminders():
+    deadline = datetime(2025, 5, 1, 12, 0, tzinfo=timezone.utc)
+    # What send_notification receives after the message went through the
+    # broker with Celery's JSON serializer.
+    task = loads(dumps({
+        "assignment_name": "Essay",
+        "course_name": "CS 250",
+        "deadline": deadline,
+    }))
+    # A reminder folded in from the database, earlier than the first one.
+    folded = {
+        "assignment_name": "Quiz",
+        "course_name": "CS 101",
+        "deadline": deadline - timedelta(hours=1),
+    }
+
+    message = digest_message([
+        {**task, "deadline": parse_deadline(task["deadline"])},
+        folded,
+    ])
+
+    assert message.index("Quiz") < message.index("Essay")
+
+
+def test_parse_deadline_accepts_iso_strings():
+    deadline = datetime(2025, 5, 1, 12, 0, tzinfo=timezone.utc)
+    assert parse_deadline(deadline.isoformat()) == deadline
+    assert parse_deadline(deadline) is deadline